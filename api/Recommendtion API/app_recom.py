@@ -1,111 +1,308 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import threading
+import hmac
 import pandas as pd
-import joblib
 import uvicorn
 import pickle
+import json
+import time
 import os
+from recommendation_table import TopNTable
+from factor_index import FactorRecommender
+from artifacts import RatingsMatrix, load_customer_data, is_stale, ARTIFACTS_DIR
+from interactions import InteractionMatrix
+from product_cards import ProductCardStore, format_recommendations, render_response
 from dotenv import load_dotenv
 load_dotenv()
 ip = os.getenv("IP")
 app = FastAPI()
 
-# Load customer data from pickle
-try:
+# "dense" ranks the predicted ratings matrix, "factors" only loads the user/item
+# factors from online_update.py and searches them per request (MIPS_INDEX exact or ivf)
+SERVING_MODE = os.getenv("RECOMMENDATION_SERVING", "dense")
+MIPS_INDEX = os.getenv("MIPS_INDEX", "exact")
+IVF_LISTS = int(os.getenv("IVF_LISTS", 0)) or None
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", 8))
+TOP_N = int(os.getenv("RECOMMENDATION_TOP_N", 20))
+TOP_SELLING_K = int(os.getenv("TOP_SELLING_K", 50))
+TOP_SELLING_CATEGORIES = [c.strip() for c in os.getenv("TOP_SELLING_CATEGORIES", "").split(",") if c.strip()]
+RELOAD_INTERVAL = float(os.getenv("RELOAD_INTERVAL", 10))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+CUSTOMER_DATA_FEATHER = os.path.join(ARTIFACTS_DIR, "customer_recommendation_data.feather")
+WATCHED_FILES = (
+    ["customer_recommendation_data.pkl", CUSTOMER_DATA_FEATHER, "all products.csv",
+     "original_ratings.pkl", "predicted_ratings.pkl"] + InteractionMatrix.files()
+    + (FactorRecommender.files() if SERVING_MODE == "factors" else RatingsMatrix.files("predicted_ratings"))
+)
+
+
+def artifacts_signature(paths):
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((path, st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+def load_customer_frame():
+    """Customer data, from the memory-mapped Arrow copy when convert_artifacts.py or loaddata.py made one.
+
+    A pickle written after the copy wins, so a retrained artifact is served before it is converted.
+    """
+    if os.path.exists(CUSTOMER_DATA_FEATHER) and not is_stale(CUSTOMER_DATA_FEATHER, 'customer_recommendation_data.pkl'):
+        return load_customer_data()
     with open('customer_recommendation_data.pkl', 'rb') as f:
-        customer_data = pickle.load(f)
-    print("Customer data loaded successfully.")
-    print("First 5 rows:")
-    print(customer_data.head())
-except Exception as e:
-    print(f"Error loading customer data: {e}")
-    customer_data = None
-
-# Load product data
-try:
-    product_data = pd.read_csv("all products.csv")
-    print("Product data loaded successfully.")
-except Exception as e:
-    print(f"Error loading product data: {e}")
-    product_data = None
-
-# Load original interactions
-try:
-    original_interactions = joblib.load("original_ratings.pkl")
-    print("Original interactions loaded successfully.")
-except Exception as e:
-    print(f"Error loading original interactions: {e}")
-    original_interactions = None
-
-# Load predicted ratings
-try:
-    predicted_ratings = joblib.load("predicted_ratings.pkl")
-    print("Predicted ratings loaded successfully.")
-except Exception as e:
-    print(f"Error loading predicted ratings: {e}")
-    predicted_ratings = None
+        return pickle.load(f)
+
+
+def load_ratings(name):
+    """Memory-map the current ``artifacts/<name>`` version, unless it was converted from another ``<name>.pkl``."""
+    if RatingsMatrix.exists(name, source=f"{name}.pkl"):
+        return RatingsMatrix.load(name)
+    return RatingsMatrix.from_pickle(f"{name}.pkl")
+
+
+def load_interactions():
+    """Known interactions as CSR, from ``artifacts/original_interactions.npz`` or a changed ``original_ratings.pkl``."""
+    if InteractionMatrix.exists(source="original_ratings.pkl"):
+        return InteractionMatrix.load()
+    return InteractionMatrix.from_pickle("original_ratings.pkl")
+
+
+class DataState:
+    """One version of everything the endpoints read, loaded and derived together.
+
+    A reload builds a complete new ``DataState`` next to the live one and then
+    replaces the module-level ``state`` reference. Requests take ``state`` once
+    when they start, so in-flight requests finish on the version they began with.
+    """
+
+    COMPONENTS = ("customer_data", "product_data", "product_cards", "original_interactions",
+                  "recommendation_table", "top_selling_payload")
+
+    def __init__(self, version):
+        self.version = version
+        self.signature = artifacts_signature(WATCHED_FILES)
+        self.loaded_at = None
+        self.timings = {}
+        self.customer_data = None
+        self.product_data = None
+        self.product_cards = None
+        self.original_interactions = None
+        self.predicted_ratings = None
+        self.recommendation_table = None
+        self.top_selling_payload = None
+
+    def _step(self, name, load):
+        start_time = time.time()
+        try:
+            return load()
+        except Exception as e:
+            print(f"Error loading {name}: {e}")
+            return None
+        finally:
+            self.timings[name] = round(time.time() - start_time, 4)
+
+    @classmethod
+    def load(cls, version=1):
+        start_time = time.time()
+        data = cls(version)
+
+        data.customer_data = data._step("customer_data", load_customer_frame)
+        if data.customer_data is not None:
+            print("Customer data loaded successfully.")
+
+        # Product data and its product cards, rendered once
+        data.product_data = data._step("product_data", lambda: pd.read_csv("all products.csv"))
+        if data.product_data is not None:
+            data.product_cards = data._step("product_cards", lambda: ProductCardStore(
+                data.product_data.rename(columns={'Product Name': 'Product Name_y'})
+            ))
+
+        data.original_interactions = data._step("original_interactions", load_interactions)
+        if data.original_interactions is not None:
+            print(f"Original interactions loaded successfully ({data.original_interactions.nnz} known ratings).")
+
+        if SERVING_MODE == "factors":
+            data.recommendation_table = data._step("recommendation_table", lambda: FactorRecommender.load(
+                data.original_interactions, index=MIPS_INDEX, n_lists=IVF_LISTS, nprobe=IVF_NPROBE
+            ))
+        else:
+            data.predicted_ratings = data._step("predicted_ratings", lambda: load_ratings("predicted_ratings"))
+            # Precompute every user's top-N unseen items
+            if data.predicted_ratings is not None:
+                data.recommendation_table = data._step("recommendation_table", lambda: TopNTable.build(
+                    data.predicted_ratings, data.original_interactions, n=TOP_N
+                ))
+
+        data.top_selling_payload = data._step("top_selling_payload",
+                                              lambda: build_top_selling_payload(data.customer_data))
+        data.timings["total"] = round(time.time() - start_time, 4)
+        data.loaded_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        print(f"Data version {version} loaded in {data.timings['total']:.2f} seconds.")
+        return data
+
+    def missing(self):
+        return {name for name in self.COMPONENTS if getattr(self, name) is None}
+
+    def info(self):
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "serving_mode": SERVING_MODE,
+            "timings": self.timings,
+            "missing": sorted(self.missing()),
+            "files": {path: mtime_ns for path, mtime_ns, _ in self.signature if mtime_ns is not None},
+        }
+
+
+reload_lock = threading.Lock()
+reload_requested = threading.Event()
+watcher_stop = threading.Event()
+last_reload_error = None
+# Files of the last rejected reload, the watcher waits for them to change again before retrying
+last_failed_signature = None
+
+
+def reload_state(reason):
+    """Build a new ``DataState`` and swap it in, unless it lost components the live one has."""
+    global state, last_reload_error, last_failed_signature
+    with reload_lock:
+        current = state
+        print(f"Reloading data ({reason}).")
+        new_state = DataState.load(version=current.version + 1 if current else 1)
+        lost = new_state.missing() - current.missing() if current else set()
+        if lost:
+            last_reload_error = f"version {new_state.version} failed to load {sorted(lost)}, kept version {current.version}"
+            last_failed_signature = new_state.signature
+            print(f"Reload rejected: {last_reload_error}")
+            return False
+        state = new_state
+        last_reload_error = None
+        last_failed_signature = None
+        return True
+
+
+def watch_data_files():
+    """Reload when watched files change on disk, or when /admin/reload asks for it."""
+    while not watcher_stop.is_set():
+        forced = reload_requested.wait(RELOAD_INTERVAL)
+        if watcher_stop.is_set():
+            break
+        reload_requested.clear()
+        try:
+            if forced:
+                reload_state("requested")
+            else:
+                signature = artifacts_signature(WATCHED_FILES)
+                if signature != state.signature and signature != last_failed_signature:
+                    reload_state("files changed on disk")
+        except Exception as e:
+            print(f"Error reloading data: {e}")
 
 
 # Request Model
 class UserRequest(BaseModel):
     customer_id: str = None
+    # At least one, zero or negative would slice the ranked lists from the wrong end
+    num_recommendations: int = Field(20, ge=1)
+
+
+class UsersRequest(BaseModel):
+    customer_ids: List[str]
+    num_recommendations: int = Field(20, ge=1)
 
 
 # Recommendation logic
-def recommend_products(predicted_ratings, original_interactions, user_id, num_recommendations=20):
+def recommend_products(user_id, num_recommendations=20, current=None):
+    current = current or state
+    table = current.recommendation_table
     try:
-        if user_id not in predicted_ratings.index:
+        if table is None or user_id not in table:
             print(f"User ID '{user_id}' not found in predictions.")
             return pd.Series(dtype='float64')
 
-        user_predictions = predicted_ratings.loc[user_id].sort_values(ascending=False)
-
-        known_interactions = (
-            original_interactions.loc[user_id].dropna().index
-            if original_interactions is not None and user_id in original_interactions.index
-            else pd.Index([])
-        )
-
-        recommended_items = user_predictions.drop(known_interactions, errors='ignore')
-        print("Recommended product IDs:", recommended_items.head(num_recommendations).index.tolist())
-        return recommended_items.head(num_recommendations)
+        # Top-N by predicted rating with known interactions masked, precomputed in dense mode
+        if num_recommendations <= table.n or current.predicted_ratings is None:
+            item_ids, scores = table.lookup(user_id, num_recommendations)
+        else:
+            item_ids, scores = table.rank(current.predicted_ratings.values, user_id, num_recommendations)
+        print("Recommended product IDs:", item_ids)
+        return pd.Series(scores, index=item_ids, dtype='float64')
     except Exception as e:
         print(f"Error in recommend_products: {e}")
         return pd.Series(dtype='float64')
 
 
-def format_recommendations(df):
-    if df is None or df.empty:
-        return []
+def build_top_selling_payload(customer_data, top_k=TOP_SELLING_K, categories=TOP_SELLING_CATEGORIES):
+    """Serialized top-selling-by-category response, built once per customer data version."""
+    if customer_data is None:
+        return None
+
+    start_time = time.time()
+    sales = customer_data
+    if categories:
+        sales = sales[sales['Category'].isin(categories)]
+
+    top_selling_ids = sales.groupby('Product ID', observed=True)['Order ID'].count().sort_values(ascending=False).head(top_k).index
+    top_df = sales[sales['Product ID'].isin(top_selling_ids)][[
+        'Product ID', 'Product Name_y', 'Product Description', 'Price', 'Rate', 'Category', 'Yahoo Image URL'
+    ]].drop_duplicates(subset=['Product ID'])
+
+    grouped = {
+        category: format_recommendations(group)
+        for category, group in top_df.groupby('Category', observed=True)
+    }
+
+    payload = json.dumps({
+        "status": "success",
+        "message": "Top selling products returned by category.",
+        "recommendations": grouped
+    }, ensure_ascii=False, allow_nan=False, default=str).encode("utf-8")
+    print(f"Top selling payload built in {time.time() - start_time:.3f} seconds ({len(payload)} bytes).")
+    return payload
+
+
+state = DataState.load()
+
+
+def top_selling_response(current):
+    """The prebuilt top-selling payload, or a 503 when building it failed for this data version."""
+    if current.top_selling_payload is None:
+        return JSONResponse(status_code=503, content={
+            "status": "error", "message": "Top selling products not available.", "recommendations": []
+        })
+    return Response(content=current.top_selling_payload, media_type="application/json")
+
+
+@app.on_event("startup")
+def start_data_watcher():
+    threading.Thread(target=watch_data_files, name="data-watcher", daemon=True).start()
 
-    df = df.replace([float('inf'), float('-inf')], pd.NA).fillna({
-        'Price': 0.0,
-        'Product Name_y': '',
-        'Product Description': '',
-        'Category': '',
-        'Yahoo Image URL': ''
-    })
 
-    return [{
-        'id': row.get('Product ID'),
-        'product_name': row.get('Product Name_y'),
-        'product_description': row.get('Product Description'),
-        'price': float(row.get('Price')) if pd.notnull(row.get('Price')) else 0.0,
-        'category': row.get('Category'),
-        'image_url': row.get('Yahoo Image URL')
-    } for _, row in df.iterrows()]
+@app.on_event("shutdown")
+def stop_data_watcher():
+    watcher_stop.set()
+    reload_requested.set()
 
 
 @app.post("/recommend_by_user")
 def recommend_products_by_user(request: UserRequest):
     user_id = request.customer_id
     print(f"Received user ID: {user_id}")
+    current = state
 
-    if predicted_ratings is None or customer_data is None or product_data is None:
+    if current.recommendation_table is None or current.customer_data is None or current.product_data is None:
         return {"status": "error", "message": "Data not loaded correctly.", "recommendations": []}
 
-    if user_id in predicted_ratings.index:
-        recommended_series = recommend_products(predicted_ratings, original_interactions, user_id)
+    if user_id in current.recommendation_table:
+        recommended_series = recommend_products(user_id, request.num_recommendations, current=current)
 
         if recommended_series.empty:
             return {
@@ -115,63 +312,80 @@ def recommend_products_by_user(request: UserRequest):
                 "recommendations": []
             }
 
-        recommended_df = product_data[
-            product_data['Product ID'].isin(recommended_series.index)
-        ][[
-            'Product ID', 'Product Name', 'Product Description', 'Price', 'Category', 'Yahoo Image URL'
-        ]].drop_duplicates(subset=['Product ID'])
-
-        # Fix column naming for consistency
-        recommended_df = recommended_df.rename(columns={'Product Name': 'Product Name_y'})
-
-        formatted = format_recommendations(recommended_df)
-
-        return {
+        body = render_response({
             "status": "success",
             "user_id": user_id,
-            "message": "Recommendations fetched successfully.",
-            "recommendations": formatted
-        }
+            "message": "Recommendations fetched successfully."
+        }, current.product_cards.render(recommended_series.index))
+        return Response(content=body, media_type="application/json")
 
     # If user_id not found, fallback to top-selling products
-    top_selling_ids = customer_data.groupby('Product ID')['Order ID'].count().sort_values(ascending=False).head(50).index
-    top_df = customer_data[customer_data['Product ID'].isin(top_selling_ids)][[
-        'Product ID', 'Product Name_y', 'Product Description', 'Price', 'Rate', 'Category', 'Yahoo Image URL'
-    ]].drop_duplicates(subset=['Product ID'])
+    return top_selling_response(current)
+
+
+def stream_user_recommendations(current, user_ids, num_recommendations, chunk_size=1024):
+    """One JSON line per customer, same body as /recommend_by_user for known customers.
+
+    Rankings come from the table a chunk at a time, so memory stays bounded by the
+    chunk size.
+    """
+    table, product_cards = current.recommendation_table, current.product_cards
+    values = None if current.predicted_ratings is None else current.predicted_ratings.values
+    for user_id, item_ids, _ in table.lookup_many(values, user_ids, num_recommendations, chunk_size=chunk_size):
+        if item_ids is None:
+            body = render_response({"status": "not_found", "user_id": user_id,
+                                    "message": "User ID not found in predictions."}, b"[]")
+        elif not item_ids:
+            body = render_response({"status": "success", "user_id": user_id,
+                                    "message": "No new recommendations available."}, b"[]")
+        else:
+            body = render_response({"status": "success", "user_id": user_id,
+                                    "message": "Recommendations fetched successfully."},
+                                   product_cards.render(item_ids))
+        yield body + b"\n"
+
+
+@app.post("/recommend_by_users")
+def recommend_products_by_users(request: UsersRequest):
+    print(f"Received {len(request.customer_ids)} user IDs")
+    current = state
+
+    if current.recommendation_table is None or current.product_data is None:
+        return {"status": "error", "message": "Data not loaded correctly.", "recommendations": []}
 
-    grouped = {
-        category: format_recommendations(group)
-        for category, group in top_df.groupby('Category')
-    }
-
-    return {
-        "status": "success",
-        "message": "Top selling products returned by category.",
-        "recommendations": grouped
-    }
+    # The stream keeps using the version it started with, even across a reload
+    return StreamingResponse(
+        stream_user_recommendations(current, request.customer_ids, request.num_recommendations),
+        media_type="application/x-ndjson"
+    )
 
 
 @app.get("/high_sales_product_recommendation")
 def get_high_sales_products():
-    if customer_data is None:
+    current = state
+    if current.customer_data is None:
         return {"status": "error", "message": "Customer data not loaded.", "recommendations": []}
 
-    top_selling_ids = customer_data.groupby('Product ID')['Order ID'].count().sort_values(ascending=False).head(50).index
-    top_df = customer_data[customer_data['Product ID'].isin(top_selling_ids)][[
-        'Product ID', 'Product Name_y', 'Product Description', 'Price', 'Rate', 'Category', 'Yahoo Image URL'
-    ]].drop_duplicates(subset=['Product ID'])
+    return top_selling_response(current)
 
-    grouped = {
-        category: format_recommendations(group)
-        for category, group in top_df.groupby('Category')
-    }
 
-    return {
-        "status": "success",
-        "message": "Top selling products returned by category.",
-        "recommendations": grouped
-    }
+@app.post("/admin/reload")
+def request_reload(x_admin_token: Optional[str] = Header(None)):
+    # Disabled unless ADMIN_TOKEN is configured, the watcher still picks up file changes
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+    reload_requested.set()
+    return {"status": "accepted", "message": "Reload scheduled in the background.", "version": state.version}
+
 
+@app.get("/data_version")
+def get_data_version():
+    info = state.info()
+    info["reloading"] = reload_lock.locked()
+    info["last_reload_error"] = last_reload_error
+    return info
 
 if __name__ == "__main__":
     uvicorn.run(app, host=ip, port=1115)
\ No newline at end of file
@@ -0,0 +1,236 @@
+import pandas as pd
+import numpy as np
+import joblib
+import shutil
+import json
+import time
+import re
+import os
+
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", "artifacts")
+
+
+def file_signature(path):
+    """``{"mtime_ns", "size"}`` of ``path``, None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def is_stale(copy_path, source_path, recorded=None):
+    """Whether the pickle at ``source_path`` changed since its converted copy was written.
+
+    ``recorded`` is the pickle's signature stored with the copy, any difference
+    means a different pickle. Copies written before signatures were stored fall
+    back to comparing modification times.
+    """
+    source = file_signature(source_path)
+    if source is None:
+        return False
+    if recorded is not None:
+        return recorded != source
+    try:
+        return source["mtime_ns"] > os.stat(copy_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _new_version(name, directory):
+    """Create and return a fresh ``<name>.<time_ns>`` version directory."""
+    os.makedirs(directory, exist_ok=True)
+    version = f"{name}.{time.time_ns()}"
+    os.makedirs(os.path.join(directory, version))
+    return version
+
+
+def _read_manifest(name, directory):
+    manifest_path = os.path.join(directory, f"{name}.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(name, directory, manifest):
+    tmp_path = os.path.join(directory, f"{name}.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(directory, f"{name}.json"))
+
+
+def _remove_old_versions(name, directory, keep):
+    pattern = re.compile(rf"^{re.escape(name)}\.(\d+)$")
+    versions = sorted(
+        (int(m.group(1)), entry) for entry in os.listdir(directory)
+        if (m := pattern.match(entry)) and os.path.isdir(os.path.join(directory, entry))
+    )
+    for _, entry in versions[:-keep]:
+        shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+
+class RatingsMatrix:
+    """Users x items ratings as a plain 2-D array plus user and item ID indexes.
+
+    Loaded from ``.npy`` with ``mmap_mode="r"`` every uvicorn worker maps the same
+    file, so they share page-cache pages instead of each unpickling its own copy.
+    ``source`` is the ``file_signature`` of the pickle the matrix was converted
+    from, saved in the manifest so a retrained pickle makes the copy stale.
+    """
+
+    def __init__(self, values, user_ids, item_ids, source=None):
+        self.values = values
+        self.user_ids = np.asarray(user_ids, dtype=object)
+        self.item_ids = np.asarray(item_ids, dtype=object)
+        self.user_index = {user_id: row for row, user_id in enumerate(self.user_ids)}
+        self.source = source
+
+    @classmethod
+    def from_frame(cls, df, dtype=np.float32, source=None):
+        return cls(df.to_numpy(dtype=dtype), df.index.to_numpy(), df.columns.to_numpy(), source=source)
+
+    @classmethod
+    def from_pickle(cls, path, dtype=np.float32):
+        return cls.from_frame(joblib.load(path), dtype, source=file_signature(path))
+
+    def to_frame(self):
+        return pd.DataFrame(np.asarray(self.values), index=self.user_ids, columns=self.item_ids)
+
+    def save(self, name, directory=ARTIFACTS_DIR, keep=2):
+        """Write a new version directory, then point the ``<name>.json`` manifest at it.
+
+        Readers only follow the manifest, so they get the old matrix and IDs or
+        the new ones, never a mix. Files a worker may have memory-mapped are never
+        replaced in place (that fails on Windows); versions more than ``keep``
+        saves old are removed, and retried on a later save while still mapped.
+        """
+        version = _new_version(name, directory)
+        values_path, users_path, items_path = self._version_paths(directory, version)
+        np.save(values_path, np.ascontiguousarray(self.values))
+        for path, ids in ((users_path, self.user_ids), (items_path, self.item_ids)):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([str(i) for i in ids], f)
+
+        _write_manifest(name, directory, {"version": version, "shape": list(self.shape), "source": self.source})
+        _remove_old_versions(name, directory, keep)
+
+    @staticmethod
+    def _version_paths(directory, version):
+        return [os.path.join(directory, version, f) for f in ("values.npy", "users.json", "items.json")]
+
+    @staticmethod
+    def _paths(name, directory, manifest=None):
+        """Files of the current version, or of the flat layout written before versioned saves."""
+        manifest = manifest or _read_manifest(name, directory)
+        if manifest is not None:
+            return RatingsMatrix._version_paths(directory, manifest["version"])
+        return [os.path.join(directory, f"{name}{suffix}") for suffix in (".npy", "_users.json", "_items.json")]
+
+    @classmethod
+    def load(cls, name, directory=ARTIFACTS_DIR, mmap=True):
+        manifest = _read_manifest(name, directory)
+        values_path, users_path, items_path = cls._paths(name, directory, manifest)
+        values = np.load(values_path, mmap_mode="r" if mmap else None)
+        with open(users_path, encoding="utf-8") as f:
+            user_ids = json.load(f)
+        with open(items_path, encoding="utf-8") as f:
+            item_ids = json.load(f)
+        if values.shape != (len(user_ids), len(item_ids)):
+            raise ValueError(f"{name}: {values.shape} matrix does not match "
+                             f"{len(user_ids)} user and {len(item_ids)} item IDs")
+        return cls(values, user_ids, item_ids, source=(manifest or {}).get("source"))
+
+    @staticmethod
+    def exists(name, directory=ARTIFACTS_DIR, source=None):
+        """Whether a converted matrix exists and was converted from the current ``source`` pickle."""
+        manifest = _read_manifest(name, directory)
+        values_path = RatingsMatrix._paths(name, directory, manifest)[0]
+        if not os.path.exists(values_path):
+            return False
+        copy_path = os.path.join(directory, f"{name}.json") if manifest else values_path
+        if source is not None and is_stale(copy_path, source, (manifest or {}).get("source")):
+            print(f"{copy_path} was not converted from the current {source}, loading the pickle "
+                  f"(re-run convert_artifacts.py)")
+            return False
+        return True
+
+    @staticmethod
+    def files(name, directory=ARTIFACTS_DIR):
+        """Files whose change means a new matrix: the manifest, and the flat layout's files."""
+        return [os.path.join(directory, f"{name}{suffix}") for suffix in (".json", ".npy", "_users.json", "_items.json")]
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def __contains__(self, user_id):
+        return user_id in self.user_index
+
+    def row(self, user_id):
+        return self.values[self.user_index[user_id]]
+
+
+class FactorMatrix:
+    """One factor vector per ID (users or items) from online_update.py.
+
+    Saved like ``RatingsMatrix``: ``values.npy`` and ``ids.json`` in a version
+    directory behind a ``<name>.json`` manifest, memory-mapped on load.
+    """
+
+    def __init__(self, values, row_ids):
+        self.values = values
+        self.row_ids = np.asarray(row_ids, dtype=object)
+
+    @property
+    def rank(self):
+        return self.values.shape[1]
+
+    def save(self, name, directory=ARTIFACTS_DIR, keep=2):
+        version = _new_version(name, directory)
+        np.save(os.path.join(directory, version, "values.npy"), np.ascontiguousarray(self.values))
+        with open(os.path.join(directory, version, "ids.json"), "w", encoding="utf-8") as f:
+            json.dump([str(i) for i in self.row_ids], f)
+        _write_manifest(name, directory, {"version": version, "shape": list(self.values.shape)})
+        _remove_old_versions(name, directory, keep)
+
+    @classmethod
+    def load(cls, name, directory=ARTIFACTS_DIR, mmap=True):
+        manifest = _read_manifest(name, directory)
+        if manifest is None:
+            raise FileNotFoundError(f"{os.path.join(directory, name)}.json not found")
+        version_path = os.path.join(directory, manifest["version"])
+        ids_path = os.path.join(version_path, "ids.json")
+        if not os.path.exists(ids_path):
+            # Factors saved as a RatingsMatrix kept their row IDs in users.json
+            ids_path = os.path.join(version_path, "users.json")
+        values = np.load(os.path.join(version_path, "values.npy"), mmap_mode="r" if mmap else None)
+        with open(ids_path, encoding="utf-8") as f:
+            row_ids = json.load(f)
+        if values.ndim != 2 or values.shape[0] != len(row_ids):
+            raise ValueError(f"{name}: {values.shape} factors do not match {len(row_ids)} IDs")
+        return cls(values, row_ids)
+
+    @staticmethod
+    def exists(name, directory=ARTIFACTS_DIR):
+        manifest = _read_manifest(name, directory)
+        return manifest is not None and os.path.exists(os.path.join(directory, manifest["version"], "values.npy"))
+
+    @staticmethod
+    def files(name, directory=ARTIFACTS_DIR):
+        return [os.path.join(directory, f"{name}.json")]
+
+
+def save_customer_data(customer_data, directory=ARTIFACTS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, "customer_recommendation_data.feather.tmp")
+    customer_data.reset_index(drop=True).to_feather(tmp_path)
+    os.replace(tmp_path, os.path.join(directory, "customer_recommendation_data.feather"))
+
+
+def load_customer_data(directory=ARTIFACTS_DIR):
+    """Read the Arrow copy of the customer data through a memory map."""
+    import pyarrow.feather as feather
+
+    table = feather.read_table(os.path.join(directory, "customer_recommendation_data.feather"), memory_map=True)
+    return table.to_pandas()
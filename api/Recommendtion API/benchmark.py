@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+import subprocess
+import tempfile
+import json
+import time
+import joblib
+import sys
+import os
+from artifacts import RatingsMatrix
+from interactions import InteractionMatrix
+from product_cards import ProductCardStore, render_response
+from online_update import FactorModel
+from factor_index import FactorRecommender
+from recommendation_table import TopNTable
+
+
+def synthetic_ratings(n_users, n_items, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        rng.random((n_users, n_items), dtype=np.float32),
+        index=[f"CU-{i:06d}" for i in range(n_users)],
+        columns=[f"PR-{j:06d}" for j in range(n_items)],
+    )
+
+
+LOAD_SCRIPTS = {
+    "pickle": "m = joblib.load('predicted_ratings.pkl'); m.to_numpy().sum()",
+    "mmap": "m = RatingsMatrix.load('predicted_ratings', '.'); m.values.sum()",
+}
+# Both loaders scan the whole matrix once, like building the top-N table does.
+# Private memory (USS, Linux only) is what each extra worker really costs.
+MEASURE = """
+import time, joblib
+from artifacts import RatingsMatrix
+from interactions import InteractionMatrix
+from product_cards import ProductCardStore, render_response
+from online_update import FactorModel
+from factor_index import FactorRecommender
+from recommendation_table import TopNTable
+
+def private_kib():
+    with open('/proc/self/smaps_rollup') as f:
+        return sum(int(line.split()[1]) for line in f if line.startswith(('Private_Clean', 'Private_Dirty')))
+
+before = private_kib()
+start_time = time.time()
+{load}
+print(time.time() - start_time, private_kib() - before)
+"""
+
+
+def benchmark_artifact_loading(n_users=20000, n_items=2000, workers=4):
+    """Load time and private memory per worker process, pickle vs memory-mapped .npy.
+
+    Each worker is a fresh interpreter. With mmap the matrix pages live in the
+    shared page cache, so private memory per worker stays flat as the matrix grows.
+    """
+    df = synthetic_ratings(n_users, n_items)
+    with tempfile.TemporaryDirectory() as directory:
+        joblib.dump(df, os.path.join(directory, "predicted_ratings.pkl"))
+        RatingsMatrix.from_frame(df).save("predicted_ratings", directory)
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+
+        print(f"[ARTIFACTS] {n_users} users x {n_items} items ({df.to_numpy().nbytes / 2**20:.0f} MiB float32), "
+              f"{workers} workers")
+        for name, load in LOAD_SCRIPTS.items():
+            procs = [
+                subprocess.Popen([sys.executable, "-c", MEASURE.format(load=load)], cwd=directory, env=env,
+                                 stdout=subprocess.PIPE, text=True)
+                for _ in range(workers)
+            ]
+            results = [tuple(map(float, p.communicate()[0].split())) for p in procs]
+            seconds = np.mean([r[0] for r in results])
+            private_mib = np.mean([r[1] for r in results]) / 1024
+            print(f"  {name:7s} load={seconds * 1000:8.1f} ms/worker  private memory={private_mib:7.1f} MiB/worker")
+
+
+def benchmark_interaction_memory(n_users=100000, n_items=5000, per_user=5, lookups=10000, seed=0):
+    """Memory and per-user lookup time of known interactions, dense NaN frame vs CSR."""
+    rng = np.random.default_rng(seed)
+    users = np.repeat([f"CU-{i:06d}" for i in range(n_users)], per_user)
+    items = np.array([f"PR-{j:06d}" for j in range(n_items)])[rng.integers(0, n_items, len(users))]
+    interactions = InteractionMatrix.from_records(users, items, rng.integers(1, 6, len(users)))
+    csr_bytes = sum(a.nbytes for a in (interactions.matrix.data, interactions.matrix.indices, interactions.matrix.indptr))
+    dense_bytes = n_users * n_items * 8  # float64 DataFrame, what the pickled original_ratings holds
+    print(f"[INTERACTIONS] {n_users} users x {n_items} items, {interactions.nnz} known ratings")
+    print(f"  dense={dense_bytes / 2**20:10.1f} MiB  csr={csr_bytes / 2**20:8.2f} MiB")
+
+    sample = rng.choice(interactions.user_ids, lookups)
+    start_time = time.time()
+    for user_id in sample:
+        interactions.known_items(user_id)
+    print(f"  csr known_items: {(time.time() - start_time) / lookups * 1e6:.1f} us/user")
+
+
+def iterrows_response(products, product_ids):
+    """The previous per-request path: filter, fillna, iterrows into dicts, json.dumps."""
+    df = products[products['Product ID'].isin(product_ids)].drop_duplicates(subset=['Product ID'])
+    df = df.replace([float('inf'), float('-inf')], pd.NA).fillna({
+        'Price': 0.0, 'Product Name_y': '', 'Product Description': '', 'Category': '', 'Yahoo Image URL': ''
+    })
+    recommendations = [{
+        'id': row.get('Product ID'),
+        'product_name': row.get('Product Name_y'),
+        'product_description': row.get('Product Description'),
+        'price': float(row.get('Price')) if pd.notnull(row.get('Price')) else 0.0,
+        'category': row.get('Category'),
+        'image_url': row.get('Yahoo Image URL')
+    } for _, row in df.iterrows()]
+    return json.dumps({"status": "success", "recommendations": recommendations}).encode("utf-8")
+
+
+def benchmark_card_rendering(n_products=5000, per_response=20, responses=500, seed=0):
+    """Serialization cost per /recommend_by_user response, iterrows vs precomputed cards."""
+    rng = np.random.default_rng(seed)
+    products = pd.DataFrame({
+        'Product ID': [f"PR-{j:06d}" for j in range(n_products)],
+        'Product Name_y': [f"Product {j}" for j in range(n_products)],
+        'Product Description': ["A product description of typical length for the catalog."] * n_products,
+        'Price': rng.random(n_products) * 500,
+        'Category': rng.choice(["Furniture", "Office Supplies", "Technology"], n_products),
+        'Yahoo Image URL': [f"https://images.example.com/{j}.jpg" for j in range(n_products)],
+    })
+    requests = [products['Product ID'].to_numpy()[rng.choice(n_products, per_response, replace=False)]
+                for _ in range(responses)]
+    store = ProductCardStore(products)
+
+    print(f"[CARDS] {n_products} products, {per_response} per response, {responses} responses")
+    for name, render in (
+        ("iterrows", lambda ids: iterrows_response(products, ids)),
+        ("cards", lambda ids: render_response({"status": "success"}, store.render(ids))),
+    ):
+        start_time = time.time()
+        for ids in requests:
+            render(ids)
+        print(f"  {name:8s} {(time.time() - start_time) / responses * 1e6:9.1f} us/response")
+
+
+def benchmark_online_update(n_users=20000, n_items=2000, rank=32, batch_sizes=(1, 10, 100, 1000, 10000), seed=0):
+    """Latency of one incremental factor update, and of patching the dense matrix, per batch size."""
+    rng = np.random.default_rng(seed)
+    user_ids = [f"CU-{i:06d}" for i in range(n_users)]
+    item_ids = [f"PR-{j:06d}" for j in range(n_items)]
+    factors = lambda n: rng.normal(0, 0.3, (n, rank)).astype(np.float32)
+    ratings = RatingsMatrix(factors(n_users) @ factors(n_items).T, user_ids, item_ids)
+
+    print(f"[ONLINE MF] {n_users} users x {n_items} items, rank {rank}")
+    for batch_size in batch_sizes:
+        model = FactorModel(factors(n_users), factors(n_items), user_ids, item_ids)
+        users = [user_ids[i] for i in rng.integers(0, n_users, batch_size)]
+        items = [item_ids[j] for j in rng.integers(0, n_items, batch_size)]
+        rates = rng.integers(1, 6, batch_size)
+
+        start_time = time.time()
+        before = model.partial_fit(users, items, rates)
+        fit_seconds = time.time() - start_time
+        start_time = time.time()
+        model.update_ratings(ratings, before)
+        patch_seconds = time.time() - start_time
+        print(f"  batch={batch_size:6d}  fit={fit_seconds * 1000:8.1f} ms  dense patch={patch_seconds * 1000:8.1f} ms")
+
+
+def synthetic_factors(n_users, n_items, rank, n_clusters=50, seed=0):
+    """User factors plus clustered item factors, closer to trained MF output than pure noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 1, (n_clusters, rank))
+    item_factors = centers[rng.integers(0, n_clusters, n_items)] + rng.normal(0, 0.5, (n_items, rank))
+    user_factors = rng.normal(0, 1, (n_users, rank))
+    return user_factors.astype(np.float32), item_factors.astype(np.float32)
+
+
+def benchmark_factor_serving(base_users=300, base_items=650, rank=32, scales=(1, 10, 100), n=20,
+                             sample_users=200, nprobes=(4, 8, 16), max_dense_cells=50_000_000):
+    """Memory and recall@n of factor serving (exact and IVF) against the dense path, per scale.
+
+    The base size is roughly the current customers x products. Where the dense
+    matrix fits in ``max_dense_cells`` the reference is the dense ``TopNTable``,
+    above that it is the exact factor search (the same ranking, without the matrix).
+    """
+    print(f"[FACTOR SERVING] base {base_users} users x {base_items} items, rank {rank}, recall@{n}")
+    for scale in scales:
+        n_users, n_items = base_users * scale, base_items * scale
+        user_factors, item_factors = synthetic_factors(n_users, n_items, rank)
+        user_ids = [f"CU-{i:07d}" for i in range(n_users)]
+        item_ids = [f"PR-{j:07d}" for j in range(n_items)]
+        rows = np.random.default_rng(1).choice(n_users, min(sample_users, n_users), replace=False)
+        exact = FactorRecommender(user_factors, item_factors, user_ids, item_ids)
+
+        dense_mib = n_users * n_items * 4 / 2**20
+        factors_mib = (user_factors.nbytes + item_factors.nbytes) / 2**20
+        if n_users * n_items <= max_dense_cells:
+            table = TopNTable.build(RatingsMatrix(user_factors @ item_factors.T, user_ids, item_ids), n=n)
+            reference, source = table.items[rows], "dense"
+        else:
+            reference, source = exact.search(rows, n)[0], "exact"
+        print(f"  x{scale:<4d} {n_users} x {n_items}: dense={dense_mib:9.1f} MiB  factors={factors_mib:7.1f} MiB  "
+              f"(reference: {source})")
+
+        start_time = time.time()
+        found, _ = exact.search(rows, n)
+        print(f"        exact      recall={recall_at_n(reference, found):.3f}  "
+              f"{(time.time() - start_time) / len(rows) * 1000:6.2f} ms/user")
+        for nprobe in nprobes:
+            ivf = FactorRecommender(user_factors, item_factors, user_ids, item_ids, index="ivf", nprobe=nprobe)
+            start_time = time.time()
+            found, _ = ivf.search(rows, n)
+            print(f"        ivf np={nprobe:<3d} recall={recall_at_n(reference, found):.3f}  "
+                  f"{(time.time() - start_time) / len(rows) * 1000:6.2f} ms/user  "
+                  f"lists={len(ivf.ivf.lists)} index={ivf.ivf.nbytes / 2**20:.1f} MiB")
+
+
+def recall_at_n(reference, found):
+    return np.mean([len(set(r[r >= 0]) & set(f[f >= 0])) / max(1, (r >= 0).sum()) for r, f in zip(reference, found)])
+
+
+if __name__ == "__main__":
+    benchmark_artifact_loading()
+    benchmark_interaction_memory()
+    benchmark_card_rendering()
+    benchmark_online_update()
+    benchmark_factor_serving()
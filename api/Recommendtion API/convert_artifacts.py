@@ -0,0 +1,54 @@
+import argparse
+import pickle
+import time
+from artifacts import RatingsMatrix, save_customer_data, ARTIFACTS_DIR
+from interactions import InteractionMatrix
+from online_update import FactorModel, MF_RANK
+
+# Convert the pickled artifacts into the memory-mappable files app_recom.py prefers.
+# Re-run this after retraining or after loaddata.py refreshed the customer data.
+
+
+def convert_artifacts(directory=ARTIFACTS_DIR, factors_rank=None):
+    start_time = time.time()
+
+    try:
+        ratings = RatingsMatrix.from_pickle("predicted_ratings.pkl")
+        ratings.save("predicted_ratings", directory)
+        print(f"predicted_ratings: {ratings.shape[0]} users x {ratings.shape[1]} items "
+              f"-> {directory}/predicted_ratings.json")
+        # Low-rank factors for RECOMMENDATION_SERVING=factors
+        if factors_rank:
+            model = FactorModel.from_ratings(ratings, factors_rank)
+            model.save(directory)
+            print(f"factors: rank {model.rank} -> {directory}/user_factors.json, {directory}/item_factors.json")
+    except FileNotFoundError:
+        print("predicted_ratings.pkl not found, skipped.")
+
+    # Known interactions are mostly empty, keep only the rated cells
+    try:
+        interactions = InteractionMatrix.from_pickle("original_ratings.pkl")
+        interactions.save(directory=directory)
+        print(f"original_ratings: {interactions.nnz} known ratings "
+              f"-> {directory}/original_interactions.npz")
+    except FileNotFoundError:
+        print("original_ratings.pkl not found, skipped.")
+
+    try:
+        with open('customer_recommendation_data.pkl', 'rb') as f:
+            customer_data = pickle.load(f)
+        save_customer_data(customer_data, directory)
+        print(f"customer data: {len(customer_data)} rows -> {directory}/customer_recommendation_data.feather")
+    except FileNotFoundError:
+        print("customer_recommendation_data.pkl not found, skipped.")
+
+    print(f"Conversion done in {time.time() - start_time:.2f} seconds.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the pickled recommendation artifacts.")
+    parser.add_argument("--factors", action="store_true",
+                        help="Also write user/item factors (truncated SVD) for factor serving.")
+    parser.add_argument("--rank", type=int, default=MF_RANK)
+    args = parser.parse_args()
+    convert_artifacts(factors_rank=args.rank if args.factors else None)
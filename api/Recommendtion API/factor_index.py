@@ -0,0 +1,146 @@
+import numpy as np
+import time
+from artifacts import FactorMatrix, ARTIFACTS_DIR
+from recommendation_table import rank_block, top_n_indices
+
+MIPS_INDEXES = ("exact", "ivf")
+
+
+class IVFIndex:
+    """Inverted-file index over item factors for approximate maximum inner product search.
+
+    Items are clustered with k-means, a query scores the cluster centroids and
+    then only the items of its ``nprobe`` best clusters.
+    """
+
+    def __init__(self, centroids, lists):
+        self.centroids = centroids
+        self.lists = lists
+
+    @classmethod
+    def build(cls, item_factors, n_lists=None, iterations=10, seed=0):
+        item_factors = np.asarray(item_factors, dtype=np.float32)
+        n_lists = min(n_lists or max(1, int(np.sqrt(len(item_factors)))), len(item_factors))
+        rng = np.random.default_rng(seed)
+        centroids = item_factors[rng.choice(len(item_factors), n_lists, replace=False)].copy()
+        item_norms = (item_factors ** 2).sum(axis=1, keepdims=True)
+        for _ in range(iterations):
+            # Squared L2 distance without the items x lists x rank temporary
+            distances = item_norms - 2 * item_factors @ centroids.T + (centroids ** 2).sum(axis=1)
+            assignment = distances.argmin(axis=1)
+            counts = np.bincount(assignment, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, item_factors)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+        lists = [order[bounds[c]:bounds[c + 1]].astype(np.int32) for c in range(n_lists)]
+        return cls(centroids, lists)
+
+    @property
+    def nbytes(self):
+        return self.centroids.nbytes + sum(items.nbytes for items in self.lists)
+
+    def candidates(self, query, nprobe):
+        """Item positions in the ``nprobe`` clusters whose centroids score highest."""
+        nprobe = min(nprobe, len(self.lists))
+        best = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self.lists[c] for c in best])
+
+
+class FactorRecommender:
+    """Serve recommendations from user and item factors, no dense ratings matrix.
+
+    Scores are ``user_factors[u] @ item_factors.T`` computed per request, with an
+    exact scan over all items or an ``IVFIndex`` probe. Has the same lookup
+    interface as ``TopNTable`` so app_recom.py can use either.
+    """
+
+    def __init__(self, user_factors, item_factors, user_ids, item_ids, known=None, index="exact",
+                 n_lists=None, nprobe=8):
+        self.user_factors = user_factors
+        self.item_factors = np.asarray(item_factors, dtype=np.float32)
+        self.user_ids = np.asarray(user_ids, dtype=object)
+        self.item_ids = np.asarray(item_ids, dtype=object)
+        self.user_index = {user_id: row for row, user_id in enumerate(self.user_ids)}
+        self.n = len(self.item_ids)
+        self.known = known
+        self.nprobe = nprobe
+        self.ivf = IVFIndex.build(self.item_factors, n_lists) if index == "ivf" else None
+
+    @classmethod
+    def load(cls, original_interactions=None, directory=ARTIFACTS_DIR, **kwargs):
+        """Memory-map the factor files written by online_update.py."""
+        start_time = time.time()
+        users = FactorMatrix.load("user_factors", directory)
+        items = FactorMatrix.load("item_factors", directory)
+        known = None
+        if original_interactions is not None:
+            known = original_interactions.align(users.row_ids, items.row_ids)
+        recommender = cls(users.values, items.values, users.row_ids, items.row_ids, known, **kwargs)
+        print(f"[FACTORS] {len(users.row_ids)} users x {len(items.row_ids)} items, rank {users.rank}, "
+              f"index={'ivf' if recommender.ivf else 'exact'}, loaded in {time.time() - start_time:.3f} seconds")
+        return recommender
+
+    @staticmethod
+    def files(directory=ARTIFACTS_DIR):
+        return FactorMatrix.files("user_factors", directory) + FactorMatrix.files("item_factors", directory)
+
+    def __contains__(self, user_id):
+        return user_id in self.user_index
+
+    def _known_positions(self, row):
+        if self.known is None:
+            return np.empty(0, dtype=np.int32)
+        return self.known.indices[self.known.indptr[row]:self.known.indptr[row + 1]]
+
+    def _search_ivf(self, row, n):
+        query = np.asarray(self.user_factors[row], dtype=np.float32)
+        candidates = self.ivf.candidates(query, self.nprobe)
+        scores = (self.item_factors[candidates] @ query)[None, :]
+        scores[0, np.isin(candidates, self._known_positions(row))] = -np.inf
+        top = top_n_indices(scores, n)[0]
+        top = top[top >= 0]
+        return candidates[top], scores[0, top]
+
+    def search(self, rows, n):
+        """Top ``n`` item positions and scores for factor rows, -1/NaN padded."""
+        if self.ivf is None:
+            block = np.asarray(self.user_factors[rows], dtype=np.float32) @ self.item_factors.T
+            return rank_block(block, None if self.known is None else self.known[rows], n)
+
+        items = np.full((len(rows), n), -1, dtype=np.int32)
+        scores = np.full((len(rows), n), np.nan, dtype=np.float32)
+        for i, row in enumerate(rows):
+            found, found_scores = self._search_ivf(row, n)
+            items[i, :len(found)] = found
+            scores[i, :len(found)] = found_scores
+        return items, scores
+
+    def lookup(self, user_id, num_recommendations=20):
+        row = self.user_index.get(user_id)
+        if row is None:
+            return None
+        items, scores = self.search(np.array([row]), min(num_recommendations, self.n))
+        valid = items[0] >= 0
+        return self.item_ids[items[0][valid]].tolist(), scores[0][valid].tolist()
+
+    def rank(self, values, user_id, num_recommendations):
+        return self.lookup(user_id, num_recommendations)
+
+    def lookup_many(self, values, user_ids, num_recommendations, chunk_size=1024):
+        """Same as ``TopNTable.lookup_many``, ``values`` is unused."""
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            rows = np.array([self.user_index.get(user_id, -1) for user_id in chunk], dtype=np.int64)
+            items, scores = self.search(rows[rows >= 0], min(num_recommendations, self.n))
+            ranked = iter(zip(items, scores))
+            for user_id, row in zip(chunk, rows):
+                if row < 0:
+                    yield user_id, None, None
+                    continue
+                positions, row_scores = next(ranked)
+                valid = positions >= 0
+                yield user_id, self.item_ids[positions[valid]].tolist(), row_scores[valid].tolist()
@@ -0,0 +1,152 @@
+from scipy import sparse
+import numpy as np
+import joblib
+import json
+import os
+from artifacts import ARTIFACTS_DIR, file_signature, is_stale
+
+
+class InteractionMatrix:
+    """Known user-item interactions (ratings) as a CSR matrix with integer-coded IDs.
+
+    Only the non-empty cells of the old dense NaN-filled DataFrame are stored, and
+    a user's rated items are one CSR row slice, O(nnz of that user). ``source`` is
+    the ``file_signature`` of the pickle it was converted from, like ``RatingsMatrix``.
+    """
+
+    def __init__(self, matrix, user_ids, item_ids, source=None):
+        self.matrix = sparse.csr_matrix(matrix, dtype=np.float32)
+        self.user_ids = np.asarray(user_ids, dtype=object)
+        self.item_ids = np.asarray(item_ids, dtype=object)
+        self.user_index = {user_id: row for row, user_id in enumerate(self.user_ids)}
+        self.item_index = {item_id: col for col, item_id in enumerate(self.item_ids)}
+        self.source = source
+
+    @classmethod
+    def from_frame(cls, df, source=None):
+        """From the dense users x items DataFrame where NaN means "no interaction"."""
+        values = df.to_numpy(dtype=np.float32)
+        rows, cols = np.nonzero(~np.isnan(values))
+        matrix = sparse.csr_matrix((values[rows, cols], (rows, cols)), shape=values.shape)
+        return cls(matrix, df.index.to_numpy(), df.columns.to_numpy(), source=source)
+
+    @classmethod
+    def from_pickle(cls, path):
+        return cls.from_frame(joblib.load(path), source=file_signature(path))
+
+    @classmethod
+    def from_records(cls, user_ids, item_ids, ratings=None):
+        """From long-format rows (e.g. the customer data), without building a dense matrix."""
+        user_codes, users = _factorize(user_ids)
+        item_codes, items = _factorize(item_ids)
+        ratings = np.ones(len(user_codes), dtype=np.float32) if ratings is None else np.asarray(ratings, np.float32)
+        matrix = sparse.coo_matrix((ratings, (user_codes, item_codes)), shape=(len(users), len(items))).tocsr()
+        matrix.sum_duplicates()
+        return cls(matrix, users, items)
+
+    def save(self, name="original_interactions", directory=ARTIFACTS_DIR):
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f"{name}.tmp.npz")
+        sparse.save_npz(tmp_path, self.matrix)
+        os.replace(tmp_path, os.path.join(directory, f"{name}.npz"))
+        tmp_path = os.path.join(directory, f"{name}_ids.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"users": [str(u) for u in self.user_ids], "items": [str(i) for i in self.item_ids],
+                       "source": self.source}, f)
+        os.replace(tmp_path, os.path.join(directory, f"{name}_ids.json"))
+
+    @classmethod
+    def load(cls, name="original_interactions", directory=ARTIFACTS_DIR):
+        matrix = sparse.load_npz(os.path.join(directory, f"{name}.npz"))
+        with open(os.path.join(directory, f"{name}_ids.json"), encoding="utf-8") as f:
+            ids = json.load(f)
+        # The .npz and the IDs are replaced one after the other, a load in between sees a mismatch
+        if matrix.shape != (len(ids["users"]), len(ids["items"])):
+            raise ValueError(f"{name}: {matrix.shape} matrix does not match "
+                             f"{len(ids['users'])} user and {len(ids['items'])} item IDs")
+        return cls(matrix, ids["users"], ids["items"], source=ids.get("source"))
+
+    @staticmethod
+    def exists(name="original_interactions", directory=ARTIFACTS_DIR, source=None):
+        """Whether a converted matrix exists and was converted from the current ``source`` pickle."""
+        ids_path = os.path.join(directory, f"{name}_ids.json")
+        if not os.path.exists(os.path.join(directory, f"{name}.npz")):
+            return False
+        if source is None:
+            return True
+        try:
+            with open(ids_path, encoding="utf-8") as f:
+                recorded = json.load(f).get("source")
+        except FileNotFoundError:
+            recorded = None
+        if is_stale(ids_path, source, recorded):
+            print(f"{ids_path} was not converted from the current {source}, loading the pickle "
+                  f"(re-run convert_artifacts.py)")
+            return False
+        return True
+
+    @staticmethod
+    def files(name="original_interactions", directory=ARTIFACTS_DIR):
+        return [os.path.join(directory, f"{name}.npz"), os.path.join(directory, f"{name}_ids.json")]
+
+    @property
+    def nnz(self):
+        return self.matrix.nnz
+
+    def __contains__(self, user_id):
+        return user_id in self.user_index
+
+    def known_items(self, user_id):
+        """Item IDs the user already interacted with."""
+        row = self.user_index.get(user_id)
+        if row is None:
+            return []
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        return self.item_ids[self.matrix.indices[start:end]].tolist()
+
+    def add(self, user_ids, item_ids, ratings):
+        """New matrix with these interactions added, new users/items appended.
+
+        A rating for an existing (user, item) cell replaces the old one.
+        """
+        users = list(self.user_ids) + [u for u in dict.fromkeys(user_ids) if u not in self.user_index]
+        items = list(self.item_ids) + [i for i in dict.fromkeys(item_ids) if i not in self.item_index]
+        user_index = {user_id: row for row, user_id in enumerate(users)}
+        item_index = {item_id: col for col, item_id in enumerate(items)}
+
+        coo = self.matrix.tocoo()
+        rows = np.concatenate([coo.row, [user_index[u] for u in user_ids]]).astype(np.int64)
+        cols = np.concatenate([coo.col, [item_index[i] for i in item_ids]]).astype(np.int64)
+        data = np.concatenate([coo.data, np.asarray(ratings, dtype=np.float32)])
+
+        # Keep the last value written for each cell
+        order = np.lexsort((np.arange(len(rows)), cols, rows))
+        rows, cols, data = rows[order], cols[order], data[order]
+        last = np.ones(len(rows), dtype=bool)
+        last[:-1] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        matrix = sparse.csr_matrix((data[last], (rows[last], cols[last])), shape=(len(users), len(items)))
+        return InteractionMatrix(matrix, users, items, source=self.source)
+
+    def align(self, user_ids, item_ids):
+        """Boolean CSR re-indexed to the given user/item order, unknown IDs dropped.
+
+        Used to mask a ratings matrix whose rows and columns are ordered differently.
+        """
+        row_map = np.array([self.user_index.get(u, -1) for u in user_ids], dtype=np.int64)
+        col_map = np.full(len(self.item_ids), -1, dtype=np.int64)
+        target_cols = {item_id: col for col, item_id in enumerate(item_ids)}
+        for col, item_id in enumerate(self.item_ids):
+            col_map[col] = target_cols.get(item_id, -1)
+
+        present = np.flatnonzero(row_map >= 0)
+        coo = self.matrix[row_map[present]].tocoo()
+        cols = col_map[coo.col]
+        keep = cols >= 0
+        rows = present[coo.row[keep]]
+        data = np.ones(int(keep.sum()), dtype=bool)
+        return sparse.csr_matrix((data, (rows, cols[keep])), shape=(len(user_ids), len(item_ids)))
+
+
+def _factorize(values):
+    uniques, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    return codes, uniques
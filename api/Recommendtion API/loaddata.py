@@ -1,34 +1,138 @@
 import pandas as pd
+import argparse
+import tracemalloc
 import pickle
+import time
+import os
+from artifacts import save_customer_data, ARTIFACTS_DIR
 
-# Load the two CSV files
-df_superstore = pd.read_csv('Superstore-Data-1-review (1).csv', encoding='ISO-8859-1')
-df_products = pd.read_csv('all products.csv', encoding='ISO-8859-1')
+SUPERSTORE_CSV = 'Superstore-Data-1-review (1).csv'
+PRODUCTS_CSV = 'all products.csv'
+PRODUCT_COLUMNS = ['Product ID', 'Product Name', 'Product Description', 'Yahoo Image URL', 'Price']
+REQUIRED_COLUMNS = ['Customer ID', 'Product ID', 'Product Name_y', 'Product Description', 'Price', 'Rate', 'Category', 'Yahoo Image URL', 'Sales', 'Order ID']
 
-# Merge the two dataframes based on 'Product ID'
-merged_df = pd.merge(df_superstore, df_products[['Product ID', 'Product Name', 'Product Description', 'Yahoo Image URL', 'Price']], on='Product ID', how='left')
+# Repeated strings are stored once per distinct value, the per-row cost is a small integer code
+SUPERSTORE_DTYPES = {
+    'Customer ID': 'category',
+    'Product ID': str,
+    'Category': 'category',
+    'Order ID': 'category',
+    'Sales': 'float64',
+    'Rate': 'float32',
+}
 
-# اطبع أول 5 صفوف من DataFrame بعد الدمج
-print("أول 5 صفوف من DataFrame بعد الدمج:")
-print(merged_df.head())
 
-# اطبع معلومات موجزة عن DataFrame بعد الدمج
-print("\nمعلومات موجزة عن DataFrame بعد الدمج:")
-print(merged_df.info())
+def load_data(directory=ARTIFACTS_DIR):
+    # Load the two CSV files
+    df_superstore = pd.read_csv(SUPERSTORE_CSV, encoding='ISO-8859-1')
+    df_products = pd.read_csv(PRODUCTS_CSV, encoding='ISO-8859-1')
 
-# حذف أي صف يحتوي على أي قيمة مفقودة (NaN)
-cleaned_df = merged_df.dropna()
+    # Merge the two dataframes based on 'Product ID'
+    merged_df = pd.merge(df_superstore, df_products[PRODUCT_COLUMNS], on='Product ID', how='left')
 
-# Select only the required columns AFTER dropping NaNs
-required_columns = ['Customer ID', 'Product ID', 'Product Name_y', 'Product Description', 'Price', 'Rate', 'Category', 'Yahoo Image URL', 'Sales', 'Order ID']
-customer_data = cleaned_df[required_columns]
+    # اطبع أول 5 صفوف من DataFrame بعد الدمج
+    print("أول 5 صفوف من DataFrame بعد الدمج:")
+    print(merged_df.head())
 
-# Save the cleaned DataFrame to a pickle file
-with open('customer_recommendation_data.pkl', 'wb') as f:
-    pickle.dump(customer_data, f)
+    # اطبع معلومات موجزة عن DataFrame بعد الدمج
+    print("\nمعلومات موجزة عن DataFrame بعد الدمج:")
+    print(merged_df.info())
 
-print("\ncustomer_recommendation_data.pkl created successfully after cleaning NaNs.")
-print("Columns in saved DataFrame:", customer_data.columns.tolist())
-print("customer_data:")
-# يمكنك هنا طباعة جزء من customer_data إذا أردت رؤية بعض البيانات الفعلية
-# print(customer_data.head())
\ No newline at end of file
+    # حذف أي صف يحتوي على أي قيمة مفقودة (NaN)
+    cleaned_df = merged_df.dropna()
+
+    # Select only the required columns AFTER dropping NaNs
+    customer_data = cleaned_df[REQUIRED_COLUMNS]
+
+    # Save the cleaned DataFrame to a pickle file
+    with open('customer_recommendation_data.pkl', 'wb') as f:
+        pickle.dump(customer_data, f)
+
+    print("\ncustomer_recommendation_data.pkl created successfully after cleaning NaNs.")
+
+    # A Feather copy from an earlier --chunked run or convert_artifacts.py would shadow the new pickle
+    feather_path = os.path.join(directory, "customer_recommendation_data.feather")
+    if os.path.exists(feather_path):
+        try:
+            os.remove(feather_path)
+            print(f"Removed the older {feather_path}.")
+        except OSError as e:
+            # Still memory-mapped on Windows; app_recom.py serves the newer pickle regardless
+            print(f"Could not remove {feather_path}: {e}")
+    print("Columns in saved DataFrame:", customer_data.columns.tolist())
+    print("customer_data:")
+    # يمكنك هنا طباعة جزء من customer_data إذا أردت رؤية بعض البيانات الفعلية
+    # print(customer_data.head())
+    return customer_data
+
+
+def concat_categorical(parts):
+    """Concatenate chunks, keeping categorical columns categorical across differing categories."""
+    if not parts:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS)
+    columns = {}
+    for column in parts[0].columns:
+        if isinstance(parts[0][column].dtype, pd.CategoricalDtype):
+            columns[column] = pd.api.types.union_categoricals([p[column] for p in parts])
+        else:
+            columns[column] = pd.concat([p[column] for p in parts], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def load_data_chunked(chunksize=100_000, directory=ARTIFACTS_DIR):
+    """Same rows as ``load_data``, streamed through in chunks with compact dtypes.
+
+    The catalog is small and read once, the order history is read ``chunksize``
+    rows at a time, merged and filtered, so only the kept required columns of
+    each chunk stay in memory. The result goes to the Feather file app_recom.py
+    memory-maps.
+    """
+    products = pd.read_csv(PRODUCTS_CSV, encoding='ISO-8859-1', usecols=PRODUCT_COLUMNS,
+                           dtype={'Product ID': str, 'Price': 'float64'})
+    for column in ['Product Name', 'Product Description', 'Yahoo Image URL']:
+        products[column] = products[column].astype('category')
+
+    parts = []
+    rows_read = 0
+    for chunk in pd.read_csv(SUPERSTORE_CSV, encoding='ISO-8859-1', dtype=SUPERSTORE_DTYPES, chunksize=chunksize):
+        rows_read += len(chunk)
+        merged = chunk.merge(products, on='Product ID', how='left')
+        # Like the full-file dropna, a row with a missing value in any column is dropped
+        kept = merged[merged.notna().all(axis=1)][REQUIRED_COLUMNS].copy()
+        kept['Product ID'] = kept['Product ID'].astype('category')
+        parts.append(kept)
+
+    customer_data = concat_categorical(parts)
+    save_customer_data(customer_data, directory)
+    print(f"{rows_read} order rows read, {len(customer_data)} kept, "
+          f"{customer_data.memory_usage(deep=True).sum() / 2**20:.1f} MiB in memory "
+          f"-> {directory}/customer_recommendation_data.feather")
+    return customer_data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the customer recommendation data.")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Stream the CSVs in chunks with compact dtypes and write Feather instead of a pickle.")
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also report the peak of Python/NumPy allocations (slows the run down).")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    if args.trace_memory:
+        tracemalloc.start()
+    if args.chunked:
+        load_data_chunked(args.chunksize)
+    else:
+        load_data()
+    report = f"Done in {time.time() - start_time:.2f} seconds"
+    try:
+        # Unix only, on Windows the RSS part of the report is left out
+        import resource
+        report += f", max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB"
+    except ImportError:
+        pass
+    if args.trace_memory:
+        report += f", peak traced memory {tracemalloc.get_traced_memory()[1] / 2**20:.1f} MiB"
+    print(report + ".")
@@ -0,0 +1,309 @@
+from scipy import sparse
+import numpy as np
+import xmlrpc.client
+import argparse
+import json
+import time
+import os
+from artifacts import FactorMatrix, RatingsMatrix, ARTIFACTS_DIR
+from interactions import InteractionMatrix
+from dotenv import load_dotenv
+load_dotenv()
+
+# Keep predicted_ratings fresh between offline retrainings: pull newly rated
+# sale.order records from Odoo, take a few gradient steps on the user and item
+# factors they touch, and publish the result into artifacts/. app_recom.py sees
+# the changed files on its next signature check and reloads them.
+
+MF_RANK = int(os.getenv("MF_RANK", 32))
+STATE_FILE = "online_update_state.json"
+# With "factors" serving app_recom.py never reads predicted_ratings, so it isn't rewritten
+SERVING_MODE = os.getenv("RECOMMENDATION_SERVING", "dense")
+
+
+class FactorModel:
+    """Low-rank user and item factors, ``rating ~ user_factors[u] @ item_factors[i]``."""
+
+    def __init__(self, user_factors, item_factors, user_ids, item_ids):
+        self.user_factors = np.asarray(user_factors, dtype=np.float32)
+        self.item_factors = np.asarray(item_factors, dtype=np.float32)
+        self.user_ids = list(user_ids)
+        self.item_ids = list(item_ids)
+        self.user_index = {user_id: row for row, user_id in enumerate(self.user_ids)}
+        self.item_index = {item_id: row for row, item_id in enumerate(self.item_ids)}
+
+    @classmethod
+    def from_ratings(cls, ratings, rank=MF_RANK):
+        """Initialize from a predicted ``RatingsMatrix`` with a truncated SVD."""
+        values = np.nan_to_num(np.asarray(ratings.values, dtype=np.float32))
+        u, s, vt = np.linalg.svd(values, full_matrices=False)
+        rank = min(rank, len(s))
+        scale = np.sqrt(s[:rank])
+        return cls(u[:, :rank] * scale, vt[:rank].T * scale, ratings.user_ids, ratings.item_ids)
+
+    @property
+    def rank(self):
+        return self.user_factors.shape[1]
+
+    def save(self, directory=ARTIFACTS_DIR):
+        FactorMatrix(self.user_factors, self.user_ids).save("user_factors", directory)
+        FactorMatrix(self.item_factors, self.item_ids).save("item_factors", directory)
+
+    @classmethod
+    def load(cls, directory=ARTIFACTS_DIR):
+        users = FactorMatrix.load("user_factors", directory, mmap=False)
+        items = FactorMatrix.load("item_factors", directory, mmap=False)
+        return cls(users.values, items.values, users.row_ids, items.row_ids)
+
+    @staticmethod
+    def exists(directory=ARTIFACTS_DIR):
+        return FactorMatrix.exists("user_factors", directory) and FactorMatrix.exists("item_factors", directory)
+
+    def _add_rows(self, user_ids, item_ids):
+        """Append factors for unseen users/items, starting from the mean factor vector."""
+        new_users = [u for u in dict.fromkeys(user_ids) if u not in self.user_index]
+        new_items = [i for i in dict.fromkeys(item_ids) if i not in self.item_index]
+        if new_users:
+            mean = self.user_factors.mean(axis=0, keepdims=True)
+            self.user_factors = np.vstack([self.user_factors, np.repeat(mean, len(new_users), axis=0)])
+            for user_id in new_users:
+                self.user_index[user_id] = len(self.user_ids)
+                self.user_ids.append(user_id)
+        if new_items:
+            mean = self.item_factors.mean(axis=0, keepdims=True)
+            self.item_factors = np.vstack([self.item_factors, np.repeat(mean, len(new_items), axis=0)])
+            for item_id in new_items:
+                self.item_index[item_id] = len(self.item_ids)
+                self.item_ids.append(item_id)
+
+    def partial_fit(self, user_ids, item_ids, ratings, steps=10, learning_rate=0.05, regularization=0.02):
+        """Take ``steps`` gradient steps on the factors touched by these ratings.
+
+        Each step is one vectorized pass over the batch, gradients are averaged per
+        user and per item so a busy product does not take a huge step. Returns the
+        affected rows and their factors from before the update, for
+        ``update_ratings``.
+        """
+        self._add_rows(user_ids, item_ids)
+        rows = np.array([self.user_index[u] for u in user_ids], dtype=np.int64)
+        cols = np.array([self.item_index[i] for i in item_ids], dtype=np.int64)
+        ratings = np.asarray(ratings, dtype=np.float32)
+
+        users, user_slots = np.unique(rows, return_inverse=True)
+        items, item_slots = np.unique(cols, return_inverse=True)
+        before = {
+            "users": users, "user_factors": self.user_factors[users].copy(),
+            "items": items, "item_factors": self.item_factors[items].copy(),
+        }
+        # Sparse (affected rows x batch) operators that average the per-rating gradients
+        batch = np.arange(len(ratings))
+        user_mean = sparse.csr_matrix((1.0 / np.bincount(user_slots)[user_slots], (user_slots, batch)),
+                                      shape=(len(users), len(ratings)), dtype=np.float32)
+        item_mean = sparse.csr_matrix((1.0 / np.bincount(item_slots)[item_slots], (item_slots, batch)),
+                                      shape=(len(items), len(ratings)), dtype=np.float32)
+
+        # Work on the affected rows only, written back once at the end
+        p_rows, q_rows = before["user_factors"].copy(), before["item_factors"].copy()
+        for _ in range(steps):
+            p, q = p_rows[user_slots], q_rows[item_slots]
+            error = (ratings - np.einsum("ij,ij->i", p, q))[:, None]
+            p_rows += learning_rate * (user_mean @ (error * q - regularization * p))
+            q_rows += learning_rate * (item_mean @ (error * p - regularization * q))
+        self.user_factors[users] = p_rows
+        self.item_factors[items] = q_rows
+        return before
+
+    def update_ratings(self, ratings, before):
+        """Apply the change of one ``partial_fit`` to a dense predicted ``RatingsMatrix``, in place.
+
+        Cells move by the difference between the new and the old factor products,
+        which is zero outside the rows of affected users and the columns of
+        affected items, so only those rows and columns are written and everything
+        else keeps its offline-trained value. The matrix is only reallocated when
+        users or items new to it have to be appended; their cells start from zero
+        and get the full product.
+        """
+        n_users, n_items = ratings.shape
+        known_users, known_items = set(ratings.user_ids), set(ratings.item_ids)
+        new_users = [u for u in self.user_ids if u not in known_users]
+        new_items = [i for i in self.item_ids if i not in known_items]
+        user_ids = list(ratings.user_ids) + new_users
+        item_ids = list(ratings.item_ids) + new_items
+        values = np.asarray(ratings.values)
+        if new_users or new_items:
+            values = np.pad(values, ((0, len(new_users)), (0, len(new_items))))
+        elif not values.flags.writeable:
+            values = values.copy()
+
+        def matrix_positions(ids, changed):
+            position = {i: n for n, i in enumerate(ids)}
+            return np.array([position[i] for i in changed], dtype=np.int64)
+
+        changed_users = [self.user_ids[row] for row in before["users"]]
+        changed_items = [self.item_ids[row] for row in before["items"]]
+        touched_rows = np.union1d(matrix_positions(user_ids, changed_users), np.arange(n_users, len(user_ids)))
+        touched_cols = np.union1d(matrix_positions(item_ids, changed_items), np.arange(n_items, len(item_ids)))
+
+        def factors_at(ids, positions, index, factors, changed, old, known):
+            """Current and pre-update factors for matrix ``positions``, zero for ids without factors."""
+            rows = np.array([index.get(ids[n], -1) for n in positions], dtype=np.int64)
+            current = np.where((rows >= 0)[:, None], factors[np.maximum(rows, 0)], 0).astype(np.float32)
+            previous = current.copy()
+            was_changed = np.isin(rows, changed)
+            previous[was_changed] = old[np.searchsorted(changed, rows[was_changed])]
+            # Cells outside the old matrix were zero, not the old factor product
+            previous[positions >= known] = 0
+            return current, previous
+
+        # Touched rows: the full new minus old product over all columns
+        q_new, q_old = factors_at(item_ids, np.arange(len(item_ids)), self.item_index, self.item_factors,
+                                  before["items"], before["item_factors"], n_items)
+        p_new, p_old = factors_at(user_ids, touched_rows, self.user_index, self.user_factors,
+                                  before["users"], before["user_factors"], n_users)
+        values[touched_rows] += p_new @ q_new.T - p_old @ q_old.T
+
+        # Other rows keep their user factors, only the touched columns move
+        other_rows = np.setdiff1d(np.arange(n_users), touched_rows)
+        p, _ = factors_at(user_ids, other_rows, self.user_index, self.user_factors,
+                          before["users"], before["user_factors"], n_users)
+        values[np.ix_(other_rows, touched_cols)] += p @ (q_new[touched_cols] - q_old[touched_cols]).T
+        # Still derived from the same pickle, a retrained one replaces these updates
+        return RatingsMatrix(values, user_ids, item_ids, source=ratings.source)
+
+
+def load_predicted_ratings(directory=ARTIFACTS_DIR):
+    if RatingsMatrix.exists("predicted_ratings", directory, source="predicted_ratings.pkl"):
+        return RatingsMatrix.load("predicted_ratings", directory, mmap=False)
+    return RatingsMatrix.from_pickle("predicted_ratings.pkl")
+
+
+def load_interactions(directory=ARTIFACTS_DIR):
+    if InteractionMatrix.exists(directory=directory, source="original_ratings.pkl"):
+        return InteractionMatrix.load(directory=directory)
+    return InteractionMatrix.from_pickle("original_ratings.pkl")
+
+
+def fetch_new_ratings(since=None, applied=None):
+    """Rated order lines written in Odoo after ``since`` (a write_date string).
+
+    Returns ``(customer_ids, product_ids, ratings, keys, last_write_date)`` with
+    customer IDs from the partner reference and product IDs from the product
+    internal reference, the same keys the recommendation data uses. ``keys`` are
+    ``"order_id:line_id"``; lines whose rating is already in ``applied`` under
+    their key are left out, so an order Odoo rewrites for another reason (state,
+    invoicing, ...) is not counted twice, while a changed rating is picked up.
+    """
+    applied = applied or {}
+    ODOO_URL = os.getenv("ODOO_URL_PUBLIC")
+    ODOO_DB = os.getenv("ODOO_DB")
+    ODOO_USER = os.getenv("ODOO_USER")
+    ODOO_PASSWORD = os.getenv("ODOO_PASSWORD")
+
+    common = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/common')
+    uid = common.authenticate(ODOO_DB, ODOO_USER, ODOO_PASSWORD, {})
+    if not uid:
+        raise Exception("Authentication failed.")
+    models = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/object')
+
+    def call(model, method, *args, **kwargs):
+        return models.execute_kw(ODOO_DB, uid, ODOO_PASSWORD, model, method, list(args), kwargs)
+
+    domain = [['x_rate', '>', 0], ['partner_id', '!=', False]]
+    if since:
+        domain.append(['write_date', '>', since])
+    orders = call('sale.order', 'search_read', domain,
+                  fields=['partner_id', 'x_rate', 'order_line', 'write_date'], order='write_date asc')
+    if not orders:
+        return [], [], [], [], since
+
+    partners = {p['id']: p['ref'] for p in call('res.partner', 'read', list({o['partner_id'][0] for o in orders}),
+                                                 fields=['ref'])}
+    lines = {l['id']: l['product_id'] for l in call('sale.order.line', 'read',
+                                                     [i for o in orders for i in o['order_line']],
+                                                     fields=['product_id'])}
+    product_ids = list({line[0] for line in lines.values() if line})
+    products = {p['id']: p['default_code'] for p in call('product.product', 'read', product_ids,
+                                                          fields=['default_code'])}
+
+    customer_ids, item_ids, ratings, keys = [], [], [], []
+    for order in orders:
+        customer_id = partners.get(order['partner_id'][0])
+        rating = float(order['x_rate'])
+        for line_id in order['order_line']:
+            key = f"{order['id']}:{line_id}"
+            product = lines.get(line_id)
+            product_id = products.get(product[0]) if product else None
+            if customer_id and product_id and applied.get(key) != rating:
+                customer_ids.append(customer_id)
+                item_ids.append(product_id)
+                ratings.append(rating)
+                keys.append(key)
+    return customer_ids, item_ids, ratings, keys, orders[-1]['write_date']
+
+
+def load_state(directory=ARTIFACTS_DIR):
+    try:
+        with open(os.path.join(directory, STATE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(state, directory=ARTIFACTS_DIR):
+    tmp_path = os.path.join(directory, f"{STATE_FILE}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, os.path.join(directory, STATE_FILE))
+
+
+def run_update(directory=ARTIFACTS_DIR, rank=MF_RANK, steps=10, serving=SERVING_MODE):
+    """Fetch new rated orders, update the factors and publish the artifacts once."""
+    start_time = time.time()
+    state = load_state(directory)
+    applied = state.get("applied", {})
+    customer_ids, item_ids, ratings, keys, last_write_date = fetch_new_ratings(state.get("last_write_date"), applied)
+    if not ratings:
+        # Still move the cursor past orders that only had already-applied lines
+        if last_write_date != state.get("last_write_date"):
+            save_state({"last_write_date": last_write_date, "applied": applied}, directory)
+        print("No new rated orders.")
+        return
+
+    predicted = None
+    if serving != "factors" or not FactorModel.exists(directory):
+        predicted = load_predicted_ratings(directory)
+    if FactorModel.exists(directory):
+        model = FactorModel.load(directory)
+    else:
+        model = FactorModel.from_ratings(predicted, rank)
+        print(f"Initialized rank-{model.rank} factors from predicted ratings.")
+
+    fit_start = time.time()
+    before = model.partial_fit(customer_ids, item_ids, ratings, steps=steps)
+    fit_seconds = time.time() - fit_start
+
+    # Factors first, the dense matrix and the interactions are what the API watches
+    model.save(directory)
+    if serving != "factors":
+        model.update_ratings(predicted, before).save("predicted_ratings", directory)
+    load_interactions(directory).add(customer_ids, item_ids, ratings).save(directory=directory)
+    applied.update(zip(keys, ratings))
+    save_state({"last_write_date": last_write_date, "applied": applied}, directory)
+    print(f"Applied {len(ratings)} ratings ({len(before['users'])} users, {len(before['items'])} items): "
+          f"fit {fit_seconds * 1000:.1f} ms, total {time.time() - start_time:.2f} seconds.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply newly rated Odoo orders to the recommendation factors.")
+    parser.add_argument("--interval", type=float, default=0, help="Seconds between polls, 0 runs once.")
+    parser.add_argument("--steps", type=int, default=10)
+    args = parser.parse_args()
+
+    while True:
+        try:
+            run_update(steps=args.steps)
+        except Exception as e:
+            print(f"Error applying online update: {e}")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
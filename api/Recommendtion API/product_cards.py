@@ -0,0 +1,63 @@
+import pandas as pd
+import orjson
+import time
+
+CARD_COLUMNS = {
+    'Product ID': 'id',
+    'Product Name_y': 'product_name',
+    'Product Description': 'product_description',
+    'Price': 'price',
+    'Category': 'category',
+    'Yahoo Image URL': 'image_url',
+}
+
+
+def format_recommendations(df):
+    """Product rows (customer-data column names) to the API's product dicts."""
+    if df is None or df.empty:
+        return []
+
+    # Categorical columns (from loaddata.py --chunked) can't take the '' fill value
+    df = df[list(CARD_COLUMNS)].astype({c: object for c in CARD_COLUMNS if c != 'Price'})
+    df = df.replace([float('inf'), float('-inf')], pd.NA).fillna({
+        'Product Name_y': '',
+        'Product Description': '',
+        'Category': '',
+        'Yahoo Image URL': ''
+    })
+    cards = df.rename(columns=CARD_COLUMNS)
+    cards['price'] = pd.to_numeric(cards['price'], errors='coerce').fillna(0.0).astype(float)
+    return cards.to_dict('records')
+
+
+def render_response(fields, recommendations):
+    """JSON body bytes: ``fields`` followed by an already serialized recommendations list."""
+    return orjson.dumps(fields)[:-1] + b',"recommendations":' + recommendations + b'}'
+
+
+class ProductCardStore:
+    """Every catalog product's JSON fragment, serialized once at load time.
+
+    A response is then a join of the cards for the selected IDs, no pandas or
+    per-field work on the request path. Cards keep catalog order, which is the
+    order /recommend_by_user has always returned them in.
+    """
+
+    def __init__(self, products):
+        start_time = time.time()
+        products = products.drop_duplicates(subset=['Product ID'])
+        self.cards = {
+            card['id']: orjson.dumps(card)
+            for card in format_recommendations(products)
+        }
+        self.positions = {product_id: position for position, product_id in enumerate(self.cards)}
+        self.build_seconds = time.time() - start_time
+        print(f"[CARDS] Rendered {len(self.cards)} product cards in {self.build_seconds:.3f} seconds")
+
+    def __len__(self):
+        return len(self.cards)
+
+    def render(self, product_ids):
+        """Serialized JSON list of the known products among ``product_ids``, in catalog order."""
+        known = sorted((i for i in set(product_ids) if i in self.positions), key=self.positions.get)
+        return b'[' + b','.join(self.cards[i] for i in known) + b']'
@@ -0,0 +1,147 @@
+import numpy as np
+import time
+
+
+def top_n_indices(scores, n):
+    """Column indices of the ``n`` highest scores in each row, best first.
+
+    ``-inf`` marks masked items, rows with fewer than ``n`` valid items are padded
+    with -1.
+    """
+    n_rows, n_items = scores.shape
+    n = min(n, n_items)
+    if n == 0:
+        return np.empty((n_rows, 0), dtype=np.int32)
+
+    if n < n_items:
+        top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    else:
+        top = np.tile(np.arange(n_items), (n_rows, 1))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1).astype(np.int32)
+    top[~np.isfinite(np.take_along_axis(top_scores, order, axis=1))] = -1
+    return top
+
+
+def rank_block(block, known, n):
+    """Top ``n`` item positions and scores for a block of ratings rows.
+
+    ``known`` is the matching boolean CSR rows (or None), its non-zero cells are
+    masked along with NaN ratings.
+    """
+    block = np.array(block, dtype=np.float32)
+    block[np.isnan(block)] = -np.inf
+    if known is not None:
+        block[known.nonzero()] = -np.inf
+    top = top_n_indices(block, n)
+    scores = np.where(top >= 0, np.take_along_axis(block, np.maximum(top, 0), axis=1), np.nan)
+    return top, scores
+
+
+class TopNTable:
+    """Each customer's top-N unseen items, precomputed into flat arrays.
+
+    ``items`` holds item positions (int32, -1 padded) and ``scores`` the matching
+    predicted ratings, one row per user, so a request is a dict lookup plus a
+    row slice.
+    """
+
+    def __init__(self, user_ids, item_ids, items, scores):
+        self.user_ids = np.asarray(user_ids, dtype=object)
+        self.item_ids = np.asarray(item_ids, dtype=object)
+        self.items = items
+        self.scores = scores
+        self.user_index = {user_id: row for row, user_id in enumerate(self.user_ids)}
+        self.n = items.shape[1]
+        self.known = None
+        self.build_seconds = None
+
+    @classmethod
+    def build(cls, predicted_ratings, original_interactions=None, n=20, chunk_size=2048):
+        """Build the table from a users x items ``RatingsMatrix``.
+
+        Items the user already rated in ``original_interactions`` (an
+        ``InteractionMatrix``, in any user/item order) are masked before ranking.
+        Users are processed in chunks to bound temporary memory, which also keeps
+        memory-mapped ratings mostly on disk.
+        """
+        start_time = time.time()
+        user_ids = predicted_ratings.user_ids
+        item_ids = predicted_ratings.item_ids
+        values = predicted_ratings.values
+
+        # Known interactions re-indexed to the predicted rows/columns, so masking a
+        # chunk only touches its non-zero cells
+        known = None
+        if original_interactions is not None:
+            known = original_interactions.align(user_ids, item_ids)
+
+        n = min(n, len(item_ids))
+        items = np.full((len(user_ids), n), -1, dtype=np.int32)
+        scores = np.full((len(user_ids), n), np.nan, dtype=np.float32)
+        for start in range(0, len(user_ids), chunk_size):
+            end = min(start + chunk_size, len(user_ids))
+            items[start:end], scores[start:end] = rank_block(
+                values[start:end], None if known is None else known[start:end], n
+            )
+
+        table = cls(user_ids, item_ids, items, scores)
+        table.known = known
+        table.build_seconds = time.time() - start_time
+        print(f"[TOP-N] Built top-{n} table for {len(user_ids)} users x {len(item_ids)} items "
+              f"in {table.build_seconds:.3f} seconds")
+        return table
+
+    def __contains__(self, user_id):
+        return user_id in self.user_index
+
+    def lookup(self, user_id, num_recommendations=None):
+        """Return ``(item_ids, scores)`` for a user, best first, or None for unknown users."""
+        row = self.user_index.get(user_id)
+        if row is None:
+            return None
+        positions = self.items[row, :num_recommendations]
+        valid = positions >= 0
+        return self.item_ids[positions[valid]].tolist(), self.scores[row, :num_recommendations][valid].tolist()
+
+    def rank(self, values, user_id, num_recommendations):
+        """Rank one user's full ratings row on the fly, for requests deeper than ``n``.
+
+        ``values`` is the matrix the table was built from, known items are masked
+        with the user's CSR row, O(nnz of that user).
+        """
+        row = self.user_index.get(user_id)
+        if row is None:
+            return None
+        known = None if self.known is None else self.known[row]
+        top, scores = rank_block(values[row:row + 1], known, num_recommendations)
+        valid = top[0] >= 0
+        return self.item_ids[top[0][valid]].tolist(), scores[0][valid].tolist()
+
+    def lookup_many(self, values, user_ids, num_recommendations, chunk_size=1024):
+        """Yield ``(user_id, item_ids, scores)`` for many users, in request order.
+
+        Each chunk of users is one slice of the precomputed arrays, or one ranked
+        block of ``values`` when more than ``n`` items are requested. Unknown users
+        yield ``(user_id, None, None)``.
+        """
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            rows = np.array([self.user_index.get(user_id, -1) for user_id in chunk], dtype=np.int64)
+            found = rows[rows >= 0]
+            if num_recommendations <= self.n:
+                items = self.items[found, :num_recommendations]
+                scores = self.scores[found, :num_recommendations]
+            else:
+                known = None if self.known is None else self.known[found]
+                items, scores = rank_block(values[found], known, num_recommendations)
+
+            ranked = iter(zip(items, scores))
+            for user_id, row in zip(chunk, rows):
+                if row < 0:
+                    yield user_id, None, None
+                    continue
+                positions, row_scores = next(ranked)
+                valid = positions >= 0
+                yield user_id, self.item_ids[positions[valid]].tolist(), row_scores[valid].tolist()
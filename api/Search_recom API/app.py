@@ -1,59 +1,153 @@
-from sentence_transformers import SentenceTransformer
-from chromadb import PersistentClient
-import pandas as pd
+import sys
+import os
+# search_common/ sits next to this service folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from search_common.encoder import load_encoder
+from chroma_manager import CollectionManager
+from search_common.vector_index import NumpyIndexManager
+from product_index import ProductIndex
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from search_common.embedding_cache import EmbeddingCache, LRUTTLCache
 from fastapi import FastAPI
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 import uvicorn
-import os
 from dotenv import load_dotenv
 load_dotenv()
 ip = os.getenv("IP")
 
 app = FastAPI()
 
-# Load the CSV and select required columns
-df = pd.read_csv("all products.csv", encoding='ISO-8859-1')
-df = df[["Product ID", "Yahoo Image URL"]]
+# Product ID -> image URL lookup, rebuilt when the CSV changes
+product_index = ProductIndex("all products.csv", columns=["Yahoo Image URL"])
+product_index.build()
 
-# Load model once globally and detect device
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# Load model once globally and detect device (ENCODER_BACKEND=torch|onnx|onnx-int8)
+model, model_name = load_encoder()
 device = "cuda" if model.device.type == "cuda" else "cpu"
 
+# Repeated queries skip the transformer; set EMBEDDING_CACHE_PATH to keep them across restarts
+embedding_cache = EmbeddingCache(
+    model, model_name,
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", 10000)),
+    ttl_seconds=float(os.getenv("EMBEDDING_CACHE_TTL", 3600)),
+    disk_path=os.getenv("EMBEDDING_CACHE_PATH"),
+    disk_max_entries=int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", 100000))
+)
+
+# Recently searched result lists, so deeper pages of the same query come from memory
+result_cache = LRUTTLCache(
+    max_entries=int(os.getenv("RESULT_CACHE_SIZE", 1000)),
+    ttl_seconds=float(os.getenv("RESULT_CACHE_TTL", 120))
+)
+RESULT_CACHE_DEPTH = int(os.getenv("RESULT_CACHE_DEPTH", 100))
+# Largest page / top_k and offset a request may ask for, a search fetches offset + limit + 1 results
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 100))
+MAX_SEARCH_OFFSET = int(os.getenv("MAX_SEARCH_OFFSET", 1000))
+
+# BM25 over product names/descriptions for mode="hybrid", rebuilt when the CSV changes
+lexical_index = LexicalIndex("inventory.csv")
+lexical_index.build()
+default_search_mode = os.getenv("SEARCH_MODE", "vector")
+if default_search_mode not in ("vector", "hybrid"):
+    raise ValueError(f"Unknown SEARCH_MODE '{default_search_mode}', expected 'vector' or 'hybrid'")
+HYBRID_CANDIDATE_FACTOR = 2
+
+# One index handle for the whole process, reopened only when the store changes.
+# SEARCH_BACKEND=numpy serves exact top-k from the index exported by load_data.py
+search_backend = os.getenv("SEARCH_BACKEND", "chroma")
+if search_backend == "numpy":
+    collection_manager = NumpyIndexManager(index_path="./numpy_index", encoder=model_name)
+else:
+    collection_manager = CollectionManager(chroma_path="./chroma_store", collection_name="products_collection",
+                                           encoder=model_name)
+
 class SearchRequest(BaseModel):
     query: str
+    mode: Optional[Literal["vector", "hybrid"]] = None  # defaults to SEARCH_MODE
+    offset: int = Field(0, ge=0, le=MAX_SEARCH_OFFSET)
+    limit: int = Field(20, ge=1, le=MAX_PAGE_SIZE)
 
-def search_inventory(user_query: str, top_k: int = 20, chroma_path="./chroma_store",
-                     collection_name="products_collection"):
-    # Connect to ChromaDB
-    client = PersistentClient(path=chroma_path)
-    collection = client.get_or_create_collection(name=collection_name)
+class BatchQuery(BaseModel):
+    query: str
+    top_k: int = Field(20, ge=1, le=MAX_PAGE_SIZE)
 
-    # Encode query
-    query_embedding = model.encode(user_query, device=device)
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchQuery]
+    mode: Optional[Literal["vector", "hybrid"]] = None
 
-    # Search collection
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=top_k
-    )
+@app.on_event("startup")
+def open_collection():
+    collection_manager.open()
 
-    # Format and return results
-    formatted_results = []
-    for i in range(len(results['documents'][0])):
-        match = {
-            "Product Name": results['documents'][0][i],  # This is the product description
-            "Description": results['documents'][0][i],
-            "metadata": results['metadatas'][0][i]
-        }
-        formatted_results.append(match)
+def search_inventory_batch(user_queries: list[str], top_ks: list[int], mode: str = "vector"):
+    """Search several queries with one encode call and one multi-embedding query.
 
-    return formatted_results
+    In "hybrid" mode the vector hits are fused with BM25 hits through
+    reciprocal-rank fusion, both lists going a bit deeper than top_k.
+    """
+    if not user_queries:
+        return []
+    hybrid = mode == "hybrid"
 
-@app.post("/predict")
-def search_product(request: SearchRequest):
-    search_input = request.query
-    results = search_inventory(search_input)
+    # Encode all queries at once, cached queries are not re-encoded
+    query_embeddings = embedding_cache.encode(user_queries, device=device)
+
+    # Shared ChromaDB collection (or NumPy index), kept open for this request if the store is reloaded
+    with collection_manager.collection() as collection:
+        return search_collection(collection, user_queries, top_ks, query_embeddings, hybrid)
 
+def search_collection(collection, user_queries, top_ks, query_embeddings, hybrid):
+    # Search collection, asking for the deepest top_k and slicing per query
+    depth = max(top_ks) * (HYBRID_CANDIDATE_FACTOR if hybrid else 1)
+    results = collection.query(
+        query_embeddings=query_embeddings.tolist(),
+        n_results=depth
+    )
+
+    hits = [
+        dict(zip(results['ids'][q], zip(results['documents'][q], results['metadatas'][q])))
+        for q in range(len(user_queries))
+    ]
+    rankings = [list(results['ids'][q][:top_k]) for q, top_k in enumerate(top_ks)]
+
+    if hybrid:
+        for q, (user_query, top_k) in enumerate(zip(user_queries, top_ks)):
+            lexical_ids = [doc_id for doc_id, _ in lexical_index.search(user_query, top_k * HYBRID_CANDIDATE_FACTOR)]
+            rankings[q] = reciprocal_rank_fusion([results['ids'][q], lexical_ids], top_k)
+
+        # Products found only by BM25 are fetched from the collection in one call
+        missing_ids = sorted({doc_id for q, ranking in enumerate(rankings) for doc_id in ranking if doc_id not in hits[q]})
+        if missing_ids:
+            fetched = collection.get(ids=missing_ids, include=["documents", "metadatas"])
+            fetched = dict(zip(fetched['ids'], zip(fetched['documents'], fetched['metadatas'])))
+            for q, ranking in enumerate(rankings):
+                for doc_id in ranking:
+                    if doc_id not in hits[q] and doc_id in fetched:
+                        hits[q][doc_id] = fetched[doc_id]
+
+    # Format and return results, one list per query
+    batch_results = []
+    for q, ranking in enumerate(rankings):
+        formatted_results = []
+        for doc_id in ranking:
+            if doc_id not in hits[q]:
+                continue
+            document, metadata = hits[q][doc_id]
+            match = {
+                "Product Name": document,  # This is the product description
+                "Description": document,
+                "metadata": metadata
+            }
+            formatted_results.append(match)
+        batch_results.append(formatted_results)
+
+    return batch_results
+
+def search_inventory(user_query: str, top_k: int = 20, mode: str = "vector"):
+    return search_inventory_batch([user_query], [top_k], mode)[0]
+
+def enrich_results(results):
     search_results = []
 
     for item in results:
@@ -68,16 +162,79 @@ def search_product(request: SearchRequest):
         product_id = metadata.get('Product ID')
 
         # Find the image for this product ID
-        matching_row = df[df["Product ID"] == product_id]
+        product_row = product_index.get(product_id)
 
-        if not matching_row.empty:
-            product_info["Yahoo Image URL"] = matching_row.iloc[0]['Yahoo Image URL']
+        if product_row is not None:
+            product_info["Yahoo Image URL"] = product_row['Yahoo Image URL']
         else:
             product_info["Yahoo Image URL"] = "Not found"
 
         search_results.append(product_info)
 
-    return {"recommendations": search_results}
+    return search_results
+
+def search_page(user_query: str, mode: str, offset: int, limit: int):
+    """Return ``(page, has_more)`` for one page of results, served from result_cache when possible.
+
+    A search fetches RESULT_CACHE_DEPTH results (or more if the page needs it),
+    plus one to tell whether a next page exists, and caches them per normalized
+    query, mode and the versions of the indexes the results come from.
+    """
+    collection_manager.get_collection()  # reopen first if the index changed, open_count versions the cache
+    key = (
+        EmbeddingCache.normalize(user_query), mode, collection_manager.stats["open_count"],
+        product_index.signature(), lexical_index.signature() if mode == "hybrid" else None,
+    )
+    needed = offset + limit
+    cached = result_cache.get(key)
+
+    # A cached list shorter than its depth holds every result, a full one may be cut before the page ends
+    if cached is None or (len(cached[1]) <= needed and len(cached[1]) == cached[0]):
+        depth = max(RESULT_CACHE_DEPTH, needed) + 1
+        results = enrich_results(search_inventory(user_query, depth, mode=mode))
+        cached = (depth, results)
+        result_cache.set(key, cached)
+
+    depth, results = cached
+    has_more = len(results) > needed
+    return results[offset:needed], has_more
+
+@app.post("/predict")
+def search_product(request: SearchRequest):
+    search_input = request.query
+    offset, limit = request.offset, request.limit
+    page, has_more = search_page(search_input, request.mode or default_search_mode, offset, limit)
+
+    return {
+        "recommendations": page,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": offset + limit if has_more else None
+    }
+
+@app.post("/predict/batch")
+def search_products_batch(request: BatchSearchRequest):
+    queries = [item.query for item in request.queries]
+    top_ks = [item.top_k for item in request.queries]
+    batch_results = search_inventory_batch(queries, top_ks, request.mode or default_search_mode)
+
+    return {
+        "results": [
+            {"query": query, "recommendations": enrich_results(results)}
+            for query, results in zip(queries, batch_results)
+        ]
+    }
+
+@app.get("/stats")
+def get_stats():
+    return {
+        "backend": search_backend,
+        "index": collection_manager.get_stats(),
+        "product_index": {"size": len(product_index), "build_seconds": product_index.build_seconds},
+        "lexical_index": {"build_seconds": lexical_index.build_seconds, "default_mode": default_search_mode},
+        "embedding_cache": embedding_cache.get_stats(),
+        "result_cache": dict(result_cache.get_stats(), policy="lru+ttl", depth=RESULT_CACHE_DEPTH),
+    }
 
 if __name__ == "__main__":
     uvicorn.run(app, host=ip, port=1114)
\ No newline at end of file
@@ -0,0 +1,93 @@
+import pandas as pd
+import numpy as np
+import time
+from app import search_inventory, search_inventory_batch, collection_manager, embedding_cache
+from chroma_manager import CollectionManager
+from search_common.vector_index import NumpyVectorIndex, INDEX_MODES
+
+SAMPLE_QUERIES = [
+    "chair", "printer", "phone", "bookcase", "office desk", "binder clips",
+    "stapler", "labels", "wireless mouse", "conference table", "paper", "headset",
+]
+
+
+def benchmark_batch_search(queries=SAMPLE_QUERIES, top_k=20, rounds=5):
+    """Compare N single searches against one batched search of the same N queries."""
+    collection_manager.open()
+    search_inventory(queries[0], top_k)  # warm up model and collection
+
+    start_time = time.time()
+    for _ in range(rounds):
+        for query in queries:
+            search_inventory(query, top_k)
+    single_time = (time.time() - start_time) / rounds
+
+    start_time = time.time()
+    for _ in range(rounds):
+        search_inventory_batch(queries, [top_k] * len(queries))
+    batch_time = (time.time() - start_time) / rounds
+
+    print(f"[BATCH] {len(queries)} queries, top_k={top_k}, {rounds} rounds")
+    print(f"  single calls: {single_time * 1000:.1f} ms ({len(queries) / single_time:.1f} queries/s)")
+    print(f"  one batch:    {batch_time * 1000:.1f} ms ({len(queries) / batch_time:.1f} queries/s)")
+    print(f"  speedup:      {single_time / batch_time:.2f}x")
+
+
+def _recall(results, truth, k):
+    return float(np.mean([len(set(r[:k]) & set(t[:k])) / max(len(t[:k]), 1) for r, t in zip(results, truth)]))
+
+
+def _time_queries(collection, query_embeddings, top_k, rounds):
+    start_time = time.time()
+    for _ in range(rounds):
+        for embedding in query_embeddings:
+            collection.query(query_embeddings=[embedding], n_results=top_k)
+    latency = (time.time() - start_time) / (rounds * len(query_embeddings))
+    ids = [collection.query(query_embeddings=[e], n_results=top_k)['ids'][0] for e in query_embeddings]
+    return latency, ids
+
+
+def benchmark_vector_backends(queries=SAMPLE_QUERIES, top_k=20, rounds=20):
+    """Recall@k and per-query latency of Chroma and the NumPy index modes.
+
+    Exact float32 search is the ground truth, so Chroma's HNSW recall is reported too.
+    """
+    chroma = CollectionManager("./chroma_store", "products_collection").open()
+    query_embeddings = embedding_cache.encode(queries)
+
+    backends = {"chroma": chroma}
+    for mode in INDEX_MODES:
+        backends[f"numpy-{mode}"] = NumpyVectorIndex.from_collection(chroma, mode=mode)
+
+    truth = backends["numpy-float32"].query(query_embeddings=query_embeddings, n_results=top_k)['ids']
+    print(f"[BACKENDS] {chroma.count()} products, {len(queries)} queries, top_k={top_k}")
+    for name, collection in backends.items():
+        latency, ids = _time_queries(collection, query_embeddings, top_k, rounds)
+        print(f"  {name:14s} recall@{top_k}={_recall(ids, truth, top_k):.3f}  latency={latency * 1000:.2f} ms/query")
+
+
+def benchmark_hybrid_search(sample_size=100, top_k=5, seed=0):
+    """Known-item hit rate@k and latency of vector vs hybrid search.
+
+    Each query is a product name from the inventory, the hit is that product in the top k.
+    """
+    df = pd.read_csv("inventory.csv").sample(n=sample_size, random_state=seed)
+    queries = df['Product Name Cleaned'].tolist()
+    expected = df['Product ID'].astype(str).tolist()
+    search_inventory_batch(queries, [top_k] * len(queries))  # warm up the embedding cache
+
+    print(f"[HYBRID] {sample_size} product-name queries, top_k={top_k}")
+    for mode in ("vector", "hybrid"):
+        start_time = time.time()
+        hits = 0
+        for query, product_id in zip(queries, expected):
+            results = search_inventory(query, top_k, mode=mode)
+            hits += any(str(r['metadata'].get('Product ID')) == product_id for r in results)
+        latency = (time.time() - start_time) / len(queries)
+        print(f"  {mode:7s} hit@{top_k}={hits / len(queries):.3f}  latency={latency * 1000:.2f} ms/query")
+
+
+if __name__ == "__main__":
+    benchmark_batch_search()
+    benchmark_vector_backends()
+    benchmark_hybrid_search()
@@ -0,0 +1,160 @@
+from chromadb import PersistentClient
+from chromadb.api.client import SharedSystemClient
+from contextlib import contextmanager
+import threading
+import time
+import os
+
+
+class _Generation:
+    """One opened client, its collection and the requests still reading from it."""
+
+    def __init__(self, client, collection, system):
+        self.client = client
+        self.collection = collection
+        self.system = system
+        self.readers = 0
+        self.retired = False
+
+
+class CollectionManager:
+    """Keeps one ChromaDB client/collection open for the whole process.
+
+    The store is opened once and the handle is shared between request threads.
+    It is reopened only when the files under ``chroma_path`` change (e.g. after
+    ``load_data.py`` re-indexed the catalog). Requests that read through
+    ``collection()`` keep the client they started with; a replaced client is
+    stopped once its last reader is done. With ``encoder`` set, a collection
+    load_data.py tagged with another encoder is refused.
+    """
+
+    def __init__(self, chroma_path="./chroma_store", collection_name="products_collection", check_interval=2.0,
+                 encoder=None):
+        self.chroma_path = chroma_path
+        self.collection_name = collection_name
+        self.check_interval = check_interval
+        self.encoder = encoder
+
+        self._lock = threading.RLock()
+        self._generation = None
+        self._client = None
+        self._collection = None
+        self._signature = None
+        self._failed_signature = None
+        self._last_check = 0.0
+
+        self.stats = {
+            "open_count": 0,
+            "reload_count": 0,
+            "last_open_seconds": None,
+            "last_opened_at": None,
+        }
+
+    def _store_signature(self):
+        # chroma.sqlite3 is rewritten on every add/upsert/delete, so its mtime and
+        # size are enough to notice a re-index done by another process.
+        sqlite_path = os.path.join(self.chroma_path, "chroma.sqlite3")
+        target = sqlite_path if os.path.exists(sqlite_path) else self.chroma_path
+        try:
+            st = os.stat(target)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _open(self, reload=False):
+        start_time = time.time()
+        if reload:
+            # chromadb caches one system per path; dropping only this path's entry
+            # makes the new client read the store as it is on disk now, while the
+            # old collection keeps its own system for the readers still using it
+            SharedSystemClient._identifier_to_system.pop(self.chroma_path, None)
+
+        client = PersistentClient(path=self.chroma_path)
+        collection = client.get_or_create_collection(name=self.collection_name)
+        # Vectors from another encoder live in a different space, query distances would be meaningless;
+        # collections from before the tag have no encoder in their metadata and are accepted
+        stored_encoder = (collection.metadata or {}).get("encoder")
+        if self.encoder is not None and stored_encoder not in (None, self.encoder):
+            raise ValueError(f"'{self.collection_name}' in {self.chroma_path} was embedded with {stored_encoder}, "
+                             f"queries use {self.encoder}; re-run load_data.py")
+        previous = self._generation
+        self._generation = _Generation(client, collection,
+                                       SharedSystemClient._identifier_to_system.get(self.chroma_path))
+        self._client, self._collection = client, collection
+        if previous is not None:
+            previous.retired = True
+            self._close_if_unused(previous)
+        self._signature = self._store_signature()
+        self._last_check = time.time()
+        elapsed = time.time() - start_time
+
+        self.stats["open_count"] += 1
+        if reload:
+            self.stats["reload_count"] += 1
+        self.stats["last_open_seconds"] = round(elapsed, 4)
+        self.stats["last_opened_at"] = time.time()
+        print(f"[CHROMA] {'Reloaded' if reload else 'Opened'} '{self.collection_name}' in {elapsed:.3f} seconds")
+
+    def open(self):
+        with self._lock:
+            if self._collection is None:
+                self._open()
+        return self._collection
+
+    def reload(self):
+        with self._lock:
+            self._open(reload=True)
+        return self._collection
+
+    def _close_if_unused(self, generation):
+        if generation.retired and generation.readers == 0 and generation.system is not None:
+            generation.system.stop()
+            generation.system = None
+
+    def _refresh(self):
+        """Open the store, or reopen it if it changed on disk; call with the lock held."""
+        if self._collection is None:
+            self._open()
+        elif time.time() - self._last_check >= self.check_interval:
+            self._last_check = time.time()
+            signature = self._store_signature()
+            if signature != self._signature and signature != self._failed_signature:
+                try:
+                    self._open(reload=True)
+                    self._failed_signature = None
+                except Exception as e:
+                    # Keep serving the current collection, retry once the store changes again
+                    self._failed_signature = signature
+                    print(f"[CHROMA] Reload of {self.chroma_path} failed, keeping the current collection: {e}")
+
+    def get_collection(self):
+        """Return the shared collection, reopening it if the store changed on disk.
+
+        The collection is only guaranteed until the next reload, read through
+        ``collection()`` when a reload must not stop it mid-query.
+        """
+        now = time.time()
+        if self._collection is not None and now - self._last_check < self.check_interval:
+            return self._collection
+
+        with self._lock:
+            self._refresh()
+            return self._collection
+
+    @contextmanager
+    def collection(self):
+        """The current collection, kept open until the ``with`` block ends even if the store is reloaded."""
+        with self._lock:
+            self._refresh()
+            generation = self._generation
+            generation.readers += 1
+        try:
+            yield generation.collection
+        finally:
+            with self._lock:
+                generation.readers -= 1
+                self._close_if_unused(generation)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, chroma_path=self.chroma_path, collection_name=self.collection_name)
@@ -0,0 +1,128 @@
+import pandas as pd
+import numpy as np
+import threading
+import math
+import time
+import re
+from watched_file import WatchedFile
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+class BM25Index:
+    """Inverted index with BM25 weights precomputed per posting.
+
+    A query only touches the postings of its own terms, so scoring cost depends on
+    how common the terms are, not on catalog size.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.postings = {}
+
+    def build(self, ids, fields, field_weights=None):
+        """Index documents made of several text fields (e.g. name and description).
+
+        ``field_weights`` repeats the terms of a field, so with a weight of 2 a
+        match in the product name counts like two matches in the description.
+        """
+        field_weights = field_weights or [1] * len(fields)
+        self.ids = list(ids)
+        term_counts = []
+        for values in zip(*fields):
+            counts = {}
+            for value, weight in zip(values, field_weights):
+                for token in tokenize(value):
+                    counts[token] = counts.get(token, 0) + weight
+            term_counts.append(counts)
+
+        doc_lengths = np.array([sum(c.values()) for c in term_counts], dtype=np.float32)
+        avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        norms = self.k1 * (1 - self.b + self.b * doc_lengths / (avg_length or 1.0))
+
+        raw = {}
+        for doc, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                raw.setdefault(term, ([], []))
+                raw[term][0].append(doc)
+                raw[term][1].append(tf)
+
+        n_docs = len(self.ids)
+        postings = {}
+        for term, (docs, tfs) in raw.items():
+            docs = np.array(docs, dtype=np.int32)
+            tfs = np.array(tfs, dtype=np.float32)
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            postings[term] = (docs, (idf * tfs * (self.k1 + 1) / (tfs + norms[docs])).astype(np.float32))
+        self.postings = postings
+        return self
+
+    def search(self, query, top_k=20):
+        """Return ``[(doc_id, score), ...]`` of the best matching documents."""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self.ids[i], float(scores[i])) for i in matched]
+
+
+class LexicalIndex(WatchedFile):
+    """BM25 index over the inventory CSV, rebuilt when the file changes."""
+
+    def __init__(self, csv_path="inventory.csv", id_column="Product ID",
+                 text_columns=("Product Name Cleaned", "Product Description"), field_weights=(2, 1),
+                 check_interval=5.0):
+        self.csv_path = csv_path
+        self.id_column = id_column
+        self.text_columns = list(text_columns)
+        self.field_weights = list(field_weights)
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._index = BM25Index()
+        self._signature = None
+        self._last_check = 0.0
+        self.build_seconds = None
+
+    def build(self):
+        start_time = time.time()
+        signature = self._file_signature()
+        df = pd.read_csv(self.csv_path, usecols=[self.id_column] + self.text_columns)
+        df = df.fillna("")
+        index = BM25Index().build(
+            df[self.id_column].astype(str).tolist(),
+            [df[column].tolist() for column in self.text_columns],
+            self.field_weights
+        )
+        with self._lock:
+            self._index = index
+            self._signature = signature
+            self._last_check = time.time()
+        self.build_seconds = time.time() - start_time
+        print(f"[LEXICAL INDEX] Indexed {len(index.ids)} products, {len(index.postings)} terms "
+              f"in {self.build_seconds:.3f} seconds")
+
+    def search(self, query, top_k=20):
+        self._refresh_if_changed()
+        return self._index.search(query, top_k)
+
+
+def reciprocal_rank_fusion(rankings, top_k, k=60):
+    """Fuse several ranked id lists, each id scores sum(1 / (k + rank))."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:top_k]
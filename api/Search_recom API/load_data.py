@@ -1,55 +1,136 @@
 import pandas as pd
-from sentence_transformers import SentenceTransformer
+import sys
+import os
+# search_common/ sits next to this service folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from search_common.encoder import load_encoder, encoder_name, MODEL_NAME
 from chromadb import PersistentClient
+from search_common.vector_index import NumpyVectorIndex, INDEX_MODES
 import torch  # Import PyTorch
+import argparse
+import hashlib
 import time
 
-def load_and_embed_inventory(csv_path="inventory.csv", collection_name="products_collection"):
-    # Load inventory data
-    df = pd.read_csv(csv_path)
+METADATA_COLUMNS = ['Product ID', 'Product Name Cleaned', 'Price', 'Product Description']
+UPSERT_BATCH_SIZE = 1000
+
 
-    # Loadx embedding model and move it to the GPU if available
-    model_name = 'all-MiniLM-L6-v2'
-    model = SentenceTransformer(model_name)
-    if torch.cuda.is_available():
+def load_embedding_model(model_name=MODEL_NAME):
+    # Load embedding model (ENCODER_BACKEND) and move it to the GPU if available
+    model, _ = load_encoder(model_name=model_name)
+    if os.getenv("ENCODER_BACKEND", "torch") != "torch":
+        device = 'cpu'
+    elif torch.cuda.is_available():
         device = 'cuda'
     else:
         device = 'cpu'
         print("CUDA not available, using CPU.")
     model.to(device)
+    return model, device
+
+
+def content_hash(row):
+    """Hash of everything we store for a product, used to detect changed rows.
 
+    The encoder name is part of the hash so switching ENCODER_BACKEND re-embeds everything.
+    """
+    values = [encoder_name()] + [str(row[column]) for column in METADATA_COLUMNS] + [str(row['full_description'])]
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def export_numpy_index(collection, index_path="./numpy_index", mode="float32"):
+    """Snapshot the collection into the memory-mapped index used by SEARCH_BACKEND=numpy."""
     start_time = time.time()
-    embeddings = model.encode(df['Product Description'].tolist(), device=device)
-    end_time = time.time()
-    embedding_time = end_time - start_time
-    print(f"Embedding time: {embedding_time:.2f} seconds")
-    df['embedding'] = embeddings.tolist()
+    index = NumpyVectorIndex.from_collection(collection, mode=mode, encoder=encoder_name())
+    index.save(index_path)
+    print(f"NumPy index ({mode}, {index.count()} vectors) written to {index_path} "
+          f"in {time.time() - start_time:.2f} seconds")
+
+
+def load_and_embed_inventory(csv_path="inventory.csv", collection_name="products_collection",
+                             chroma_path="./chroma_store", full_rebuild=False,
+                             numpy_index_path="./numpy_index", numpy_index_mode="float32"):
+    """Index the inventory into ChromaDB.
+
+    By default only new or changed products (by content hash) are re-embedded and
+    upserted, and products missing from the CSV are deleted. ``full_rebuild``
+    drops the collection and embeds everything again. The collection is then
+    exported to ``numpy_index_path`` for the NumPy search backend.
+    """
+    # Load inventory data
+    df = pd.read_csv(csv_path)
+    df['full_description'] = df['Product Name Cleaned'] + ". " + df['Product Description']
+    df['content_hash'] = df.apply(content_hash, axis=1)
+    df['id'] = df['Product ID'].astype(str)
 
     # Set up ChromaDB with persistence
-    client = PersistentClient(path="./chroma_store")
+    client = PersistentClient(path=chroma_path)
 
-    # Drop existing collection if exists
-    try:
-        client.delete_collection(name=collection_name)
-    except:
-        pass
+    if full_rebuild:
+        # Drop existing collection if exists
+        try:
+            client.delete_collection(name=collection_name)
+        except Exception:
+            pass
 
-    # Create fresh collection
     collection = client.get_or_create_collection(name=collection_name)
 
-    # Add data
-    df['full_description'] = df['Product Name Cleaned'] + ". " + df['Product Description']
+    # Compare against the hashes already stored in the collection
+    existing = collection.get(include=["metadatas"])
+    existing_hashes = {
+        doc_id: (metadata or {}).get('content_hash')
+        for doc_id, metadata in zip(existing['ids'], existing['metadatas'])
+    }
 
-    collection.add(
-        documents=df['full_description'].tolist(),
-        metadatas=df[['Product ID', 'Product Name Cleaned', 'Price','Product Description']].to_dict(orient='records'),
-        ids=df['Product ID'].astype(str).tolist(),
-        embeddings=df['embedding'].tolist()
-    )
+    removed_ids = sorted(set(existing_hashes) - set(df['id']))
+    changed = df[[existing_hashes.get(doc_id) != h for doc_id, h in zip(df['id'], df['content_hash'])]]
+    print(f"Products: {len(df)} in CSV, {len(existing_hashes)} indexed, "
+          f"{len(changed)} new/changed, {len(removed_ids)} removed.")
+
+    if removed_ids:
+        collection.delete(ids=removed_ids)
+
+    if changed.empty:
+        print("Index is up to date, nothing to embed.")
+    else:
+        model, device = load_embedding_model()
+
+        start_time = time.time()
+        embeddings = model.encode(changed['Product Description'].tolist(), device=device)
+        end_time = time.time()
+        embedding_time = end_time - start_time
+        print(f"Embedding time: {embedding_time:.2f} seconds for {len(changed)} products")
+
+        # Upsert data
+        documents = changed['full_description'].tolist()
+        metadatas = changed[METADATA_COLUMNS + ['content_hash']].to_dict(orient='records')
+        ids = changed['id'].tolist()
+        embeddings = embeddings.tolist()
+        for i in range(0, len(ids), UPSERT_BATCH_SIZE):
+            collection.upsert(
+                documents=documents[i:i + UPSERT_BATCH_SIZE],
+                metadatas=metadatas[i:i + UPSERT_BATCH_SIZE],
+                ids=ids[i:i + UPSERT_BATCH_SIZE],
+                embeddings=embeddings[i:i + UPSERT_BATCH_SIZE]
+            )
+
+    # Every product is now embedded with this encoder (it is part of the content hash),
+    # CollectionManager refuses a collection tagged with another one
+    collection.modify(metadata={"encoder": encoder_name()})
+
+    if numpy_index_path:
+        export_numpy_index(collection, numpy_index_path, numpy_index_mode)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embed inventory.csv into the products collection.")
+    parser.add_argument("--full", action="store_true", help="drop the collection and re-embed every product")
+    parser.add_argument("--numpy-index-mode", default=os.getenv("NUMPY_INDEX_MODE", "float32"),
+                        choices=INDEX_MODES, help="storage type of the exported NumPy index")
+    args = parser.parse_args()
+
     total_start_time = time.time()
-    load_and_embed_inventory()
+    load_and_embed_inventory(full_rebuild=args.full, numpy_index_mode=args.numpy_index_mode)
     total_end_time = time.time()
-    total_time = total_end_time - total_start_time
\ No newline at end of file
+    total_time = total_end_time - total_start_time
+    print(f"Total time: {total_time:.2f} seconds")
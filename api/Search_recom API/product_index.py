@@ -0,0 +1,51 @@
+import pandas as pd
+import threading
+import time
+from watched_file import WatchedFile
+
+
+class ProductIndex(WatchedFile):
+    """Product ID -> product fields lookup built once from the catalog CSV.
+
+    Replaces the per-hit ``df[df["Product ID"] == product_id]`` scan with a dict
+    lookup. The index is rebuilt when the CSV file changes on disk.
+    """
+
+    def __init__(self, csv_path="all products.csv", columns=("Yahoo Image URL",),
+                 encoding='ISO-8859-1', check_interval=5.0):
+        self.csv_path = csv_path
+        self.columns = list(columns)
+        self.encoding = encoding
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._index = {}
+        self._signature = None
+        self._last_check = 0.0
+        self.build_seconds = None
+
+    def build(self):
+        start_time = time.time()
+        signature = self._file_signature()
+        df = pd.read_csv(self.csv_path, encoding=self.encoding, usecols=["Product ID"] + self.columns)
+        df = df.drop_duplicates(subset=["Product ID"], keep="first")
+        df = df.astype(object).where(df.notna(), None)
+
+        ids = df["Product ID"].tolist()
+        rows = df[self.columns].to_dict(orient="records")
+        index = dict(zip(ids, rows))
+
+        with self._lock:
+            self._index = index
+            self._signature = signature
+            self._last_check = time.time()
+        self.build_seconds = time.time() - start_time
+        print(f"[PRODUCT INDEX] Indexed {len(index)} products in {self.build_seconds:.3f} seconds")
+
+    def get(self, product_id):
+        """Return the indexed fields for ``product_id`` or None if it is unknown."""
+        self._refresh_if_changed()
+        return self._index.get(product_id)
+
+    def __len__(self):
+        return len(self._index)
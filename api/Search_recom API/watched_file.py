@@ -0,0 +1,30 @@
+import time
+import os
+
+
+class WatchedFile:
+    """Mixin for an index built from ``csv_path`` and rebuilt when that file changes.
+
+    The class sets ``csv_path``, ``check_interval``, ``_signature`` and
+    ``_last_check`` and implements ``build()``, which stores the
+    ``_file_signature()`` taken before reading the file in ``_signature``.
+    """
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.csv_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _refresh_if_changed(self):
+        now = time.time()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if self._file_signature() != self._signature:
+                self.build()
+
+    def signature(self):
+        """Version of the indexed CSV (mtime, size), checked for changes first."""
+        self._refresh_if_changed()
+        return self._signature
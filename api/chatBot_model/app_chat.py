@@ -2,14 +2,16 @@ from typing import List, Dict
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from search_inventory import search_inventory
-from get_product_url import bot_response_with_odoo_url
+from search_inventory import search_inventory, embedding_cache
+from get_product_url import bot_response_with_odoo_url_async
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 from deep_translator import GoogleTranslator
 import re
 import traceback
+import asyncio
 import spacy
 
 # Load environment variables
@@ -20,6 +22,14 @@ model = genai.GenerativeModel("gemini-1.5-flash")
 
 inventory_loaded = True  # Later can be refreshed in background
 
+# Blocking stages run in bounded pools so the event loop keeps serving other chats:
+# cpu_executor for spaCy and embedding/search, io_executor for the translator HTTP call
+cpu_executor = ThreadPoolExecutor(max_workers=int(os.getenv("CHAT_CPU_WORKERS", 4)), thread_name_prefix="chat-cpu")
+io_executor = ThreadPoolExecutor(max_workers=int(os.getenv("CHAT_IO_WORKERS", 16)), thread_name_prefix="chat-io")
+
+async def run_blocking(executor, func, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
 # Load spaCy NLP model
 try:
     nlp = spacy.load("en_core_web_sm")
@@ -55,9 +65,10 @@ def format_result_for_prompt(results):
     )
 
 # Main chatbot logic
-def send_data(query: str, history: List[Dict[str, str]]) -> tuple[str, str, str]:
-    keywords = extract_keywords(translate_text_if_arabic(query))
-    current_context = search_inventory(keywords)
+async def send_data(query: str, history: List[Dict[str, str]]) -> tuple[str, str, str]:
+    translated_query = await run_blocking(io_executor, translate_text_if_arabic, query) if contains_arabic(query) else query
+    keywords = await run_blocking(cpu_executor, extract_keywords, translated_query)
+    current_context = await run_blocking(cpu_executor, search_inventory, keywords)
     current_context_text = format_result_for_prompt(current_context)
 
     previous_contexts = "\n".join(
@@ -112,9 +123,9 @@ ___
 
 🤖 Your Answer:
 """
-    response = model.generate_content(prompt_text).text
+    response = (await model.generate_content_async(prompt_text)).text
     print("[RESPONCE]:",response)
-    final_response = bot_response_with_odoo_url(response)
+    final_response = await bot_response_with_odoo_url_async(response)
     print("\n\n[FINAL_RESPONSE]:",final_response)
     return final_response, current_context_text, historical_context
 
@@ -144,7 +155,7 @@ async def chat_endpoint(request: ChatRequest):
     if not inventory_loaded:
         raise HTTPException(status_code=503, detail="Inventory not loaded.")
     try:
-        response_text, context_text, _ = send_data(request.query, request.history)
+        response_text, context_text, _ = await send_data(request.query, request.history)
         updated_history = request.history + [{
             "user": request.query,
             "assistant": response_text,
@@ -155,6 +166,15 @@ async def chat_endpoint(request: ChatRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error: {e}")
 
+@app.on_event("shutdown")
+def shutdown_executors():
+    cpu_executor.shutdown(wait=False)
+    io_executor.shutdown(wait=False)
+
+@app.get("/stats")
+async def get_stats():
+    return {"embedding_cache": embedding_cache.get_stats()}
+
 # Entry point
 if __name__ == "__main__":
     import uvicorn
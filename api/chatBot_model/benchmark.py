@@ -0,0 +1,39 @@
+import asyncio
+import httpx
+import time
+import os
+
+CHAT_URL = os.getenv("CHAT_URL", "http://127.0.0.1:2020/chat/")
+SAMPLE_QUERIES = [
+    "I need a cheap phone", "do you have office chairs?", "عايز طابعة", "show me bookcases",
+    "wireless mouse", "I want a headset for calls", "binder clips", "conference table",
+]
+
+
+async def run_concurrent_chats(client, concurrency):
+    async def one_chat(i):
+        payload = {"query": SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)], "history": []}
+        response = await client.post(CHAT_URL, json=payload)
+        response.raise_for_status()
+
+    start_time = time.time()
+    await asyncio.gather(*(one_chat(i) for i in range(concurrency)))
+    return time.time() - start_time
+
+
+async def benchmark_chat_concurrency(levels=(1, 2, 4, 8, 16)):
+    """Throughput of the running chat API with 1..N requests in flight.
+
+    With a non-blocking pipeline wall time stays close to one request's latency as
+    concurrency grows, so chats/s scales with the number of in-flight requests.
+    """
+    async with httpx.AsyncClient(timeout=300) as client:
+        await run_concurrent_chats(client, 1)  # warm up
+        print(f"[CHAT] {CHAT_URL}")
+        for concurrency in levels:
+            elapsed = await run_concurrent_chats(client, concurrency)
+            print(f"  in flight={concurrency:3d}  wall={elapsed:.2f} s  throughput={concurrency / elapsed:.2f} chats/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark_chat_concurrency())
@@ -2,6 +2,8 @@ import re
 import os
 from dotenv import load_dotenv
 import xmlrpc.client
+import asyncio
+import httpx
 from typing import List, Dict
 
 def extract_ids(text: str) -> list[str]:
@@ -77,16 +79,7 @@ def search_odoo_products(product_ids_to_search: List[int]) -> Dict[int, Dict[str
 
     return found_product_urls
 
-def bot_response_with_odoo_url(gemini_response: str) -> str:
-    # Extract IDs from entire response text
-    extracted_ids = extract_ids(gemini_response)
-    if not extracted_ids:
-        return gemini_response
-
-    numeric_ids = list(set(int(pid) for pid in extracted_ids))  # unique IDs
-
-    odoo_product_data = search_odoo_products(numeric_ids)
-
+def replace_product_ids(gemini_response: str, extracted_ids: List[str], odoo_product_data: Dict[int, Dict[str, str]]) -> str:
     final_response = gemini_response
 
     # Replace each <<ID>> with clickable link (or just URL)
@@ -106,6 +99,95 @@ def bot_response_with_odoo_url(gemini_response: str) -> str:
 
     return final_response
 
+def bot_response_with_odoo_url(gemini_response: str) -> str:
+    # Extract IDs from entire response text
+    extracted_ids = extract_ids(gemini_response)
+    if not extracted_ids:
+        return gemini_response
+
+    numeric_ids = list(set(int(pid) for pid in extracted_ids))  # unique IDs
+
+    odoo_product_data = search_odoo_products(numeric_ids)
+
+    return replace_product_ids(gemini_response, extracted_ids, odoo_product_data)
+
+# === Async variants used by the chat API, XML-RPC over httpx so the event loop never blocks ===
+async def odoo_call(client: httpx.AsyncClient, url: str, method: str, *params):
+    payload = xmlrpc.client.dumps(params, method, allow_none=True)
+    response = await client.post(url, content=payload, headers={"Content-Type": "text/xml"})
+    response.raise_for_status()
+    return xmlrpc.client.loads(response.content, use_builtin_types=True)[0][0]
+
+async def search_odoo_products_async(product_ids_to_search: List[int]) -> Dict[int, Dict[str, str]]:
+    load_dotenv()
+    ODOO_URL = os.getenv("ODOO_URL_PUBLIC")
+    ODOO_DB = os.getenv("ODOO_DB")
+    ODOO_USER = os.getenv("ODOO_USER")
+    ODOO_PASSWORD = os.getenv("ODOO_PASSWORD")
+
+    common_url = f'{ODOO_URL}/xmlrpc/2/common'
+    object_url = f'{ODOO_URL}/xmlrpc/2/object'
+    found_product_urls = {}
+
+    async def lookup(client, uid, product_id):
+        # Same three reads as search_odoo_products, products are looked up concurrently
+        product_product_data = await odoo_call(
+            client, object_url, 'execute_kw', ODOO_DB, uid, ODOO_PASSWORD,
+            'product.product', 'read', [product_id], {'fields': ['product_tmpl_id']}
+        )
+        if not product_product_data:
+            return
+
+        template_id = product_product_data[0]['product_tmpl_id'][0]
+
+        is_published = await odoo_call(
+            client, object_url, 'execute_kw', ODOO_DB, uid, ODOO_PASSWORD,
+            'product.template', 'search',
+            [[['id', '=', template_id], ['website_published', '=', True]]], {'limit': 1}
+        )
+        if not is_published:
+            return
+
+        template_data = await odoo_call(
+            client, object_url, 'execute_kw', ODOO_DB, uid, ODOO_PASSWORD,
+            'product.template', 'read', [template_id], {'fields': ['website_url', 'name']}
+        )
+        if template_data and template_data[0].get('website_url'):
+            raw_url = f"{ODOO_URL}{template_data[0]['website_url']}"
+            cleaned_url = re.sub(r'[.,)]+$', '', raw_url)
+            found_product_urls[product_id] = {
+                "url": cleaned_url,
+                "name": template_data[0].get("name", "View Product")
+            }
+
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            uid = await odoo_call(client, common_url, 'authenticate', ODOO_DB, ODOO_USER, ODOO_PASSWORD, {})
+            if not uid:
+                raise Exception("Authentication failed.")
+            results = await asyncio.gather(
+                *(lookup(client, uid, product_id) for product_id in product_ids_to_search),
+                return_exceptions=True
+            )
+            # A failed lookup only loses that product's link, it shows as "[Product not found]"
+            for product_id, result in zip(product_ids_to_search, results):
+                if isinstance(result, Exception):
+                    print(f"Error looking up Odoo product {product_id}: {result}")
+    except Exception as e:
+        print(f"Error searching Odoo products: {e}")
+
+    return found_product_urls
+
+async def bot_response_with_odoo_url_async(gemini_response: str) -> str:
+    extracted_ids = extract_ids(gemini_response)
+    if not extracted_ids:
+        return gemini_response
+
+    numeric_ids = list(set(int(pid) for pid in extracted_ids))  # unique IDs
+
+    odoo_product_data = await search_odoo_products_async(numeric_ids)
+
+    return replace_product_ids(gemini_response, extracted_ids, odoo_product_data)
 
 if __name__ == '__main__':
     example_text = """
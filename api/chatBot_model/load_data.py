@@ -1,8 +1,11 @@
-from sentence_transformers import SentenceTransformer
+import time, os, gc, sys
+# search_common/ sits next to this service folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from search_common.encoder import load_encoder
 from chromadb import PersistentClient
 from get_data_odoo import get_ecommerce_products_from_odoo
 from global_store import latest_chroma_path, current_chroma_client
-import time, os, gc
+from search_common.vector_index import NumpyVectorIndex
 
 
 def load_and_embed_inventory(collection_name="products_collection"):
@@ -22,12 +25,22 @@ def load_and_embed_inventory(collection_name="products_collection"):
         print("No products found.")
         return
 
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    model, model_name = load_encoder()
     descriptions = [
         f"description:{p['description_ecommerce']} price:{p['price']} name:{p['name']}"
         for p in products
     ]
     embeddings = model.encode(descriptions, device='cpu')
+    ids = [str(p['id']) for p in products]
+    metadatas = [
+        {
+            'name': p['name'],
+            'id': p['id'],
+            'price': p['price'],
+            'category': p['ecommerce_categories'],
+            'stock': p['stock_quantity']
+        } for p in products
+    ]
 
     client = PersistentClient(path=new_path)
     current_chroma_client = client
@@ -37,22 +50,20 @@ def load_and_embed_inventory(collection_name="products_collection"):
     except Exception:
         pass
 
-    collection = client.get_or_create_collection(name=collection_name)
+    # Tagged with the encoder, search_inventory refuses a store embedded by another ENCODER_BACKEND
+    collection = client.get_or_create_collection(name=collection_name, metadata={"encoder": model_name})
     collection.add(
         documents=descriptions,
         embeddings=embeddings.tolist(),
-        ids=[str(p['id']) for p in products],
-        metadatas=[
-            {
-                'name': p['name'],
-                'id': p['id'],
-                'price': p['price'],
-                'category': p['ecommerce_categories'],
-                'stock': p['stock_quantity']
-            } for p in products
-        ]
+        ids=ids,
+        metadatas=metadatas
     )
 
+    # Same snapshot for SEARCH_BACKEND=numpy, stored next to the Chroma files
+    index = NumpyVectorIndex.build(ids, embeddings, descriptions, metadatas,
+                                   mode=os.getenv("NUMPY_INDEX_MODE", "float32"), encoder=model_name)
+    index.save(os.path.join(new_path, "numpy_index"))
+
     with open("latest_chroma_path.txt", "w") as f:
         f.write(new_path)
 
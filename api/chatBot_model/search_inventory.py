@@ -1,9 +1,46 @@
 from chromadb import PersistentClient
-from sentence_transformers import SentenceTransformer
 from chromadb.config import Settings
+import sys
 import os
+# search_common/ sits next to this service folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from search_common.encoder import load_encoder
+from search_common.embedding_cache import EmbeddingCache
+from search_common.vector_index import NumpyIndexManager
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# ENCODER_BACKEND=torch|onnx|onnx-int8
+model, model_name = load_encoder()
+
+# Keywords repeat a lot between chats ("chair", "printer", "phone"), cache their embeddings
+embedding_cache = EmbeddingCache(
+    model, model_name,
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", 10000)),
+    ttl_seconds=float(os.getenv("EMBEDDING_CACHE_TTL", 3600)),
+    disk_path=os.getenv("EMBEDDING_CACHE_PATH"),
+    disk_max_entries=int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", 100000))
+)
+
+# SEARCH_BACKEND=numpy searches the index load_data.py saves next to each Chroma store
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "chroma")
+numpy_index_manager = None
+
+def get_collection(path: str, collection_name: str):
+    global numpy_index_manager
+
+    if SEARCH_BACKEND == "numpy":
+        index_path = os.path.join(path, "numpy_index")
+        if numpy_index_manager is None or numpy_index_manager.index_path != index_path:
+            numpy_index_manager = NumpyIndexManager(index_path=index_path, encoder=model_name)
+        return numpy_index_manager.get_collection()
+
+    client = PersistentClient(path=path, settings=Settings(allow_reset=True))
+    collection = client.get_or_create_collection(name=collection_name)
+    # Stores from before the tag have no encoder in their metadata and are accepted
+    stored_encoder = (collection.metadata or {}).get("encoder")
+    if stored_encoder not in (None, model_name):
+        raise ValueError(f"{path} was embedded with {stored_encoder}, queries use {model_name}; "
+                         f"reload the inventory with this ENCODER_BACKEND")
+    return collection
 
 def search_inventory(keywords: list[str], collection_name="products_collection"):
     if not os.path.exists("latest_chroma_path.txt"):
@@ -16,14 +53,13 @@ def search_inventory(keywords: list[str], collection_name="products_collection")
     if not os.path.exists(path):
         return []
 
-    client = PersistentClient(path=path, settings=Settings(allow_reset=True))
-    collection = client.get_or_create_collection(name=collection_name)
+    collection = get_collection(path, collection_name)
 
     if not keywords:
         return []
 
     # Encode all keywords
-    query_vectors = model.encode(keywords)
+    query_vectors = embedding_cache.encode(keywords)
 
     all_results = []
     seen_ids = set()
@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import get_product_url
+
+
+class FakeOdoo:
+    """Stands in for ``odoo_call``: every product is published, each call takes ``delay`` seconds."""
+
+    def __init__(self, failing_ids=(), delay=0.05):
+        self.failing_ids = set(failing_ids)
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, client, url, method, *params):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if method == 'authenticate':
+                return 2
+            model, operation, args = params[3], params[4], params[5]
+            if model == 'product.product':
+                if args[0] in self.failing_ids:
+                    raise ConnectionError(f"product {args[0]} timed out")
+                return [{'product_tmpl_id': [args[0] * 10, 'Template']}]
+            if operation == 'search':
+                return [args[0][0][2]]
+            return [{'website_url': f'/shop/{args[0]}', 'name': f'Product {args[0] // 10}'}]
+        finally:
+            self.in_flight -= 1
+
+
+class SearchOdooProductsAsyncTest(unittest.IsolatedAsyncioTestCase):
+
+    async def search(self, fake, product_ids):
+        with mock.patch.object(get_product_url, 'odoo_call', fake), \
+                mock.patch.dict('os.environ', {'ODOO_URL_PUBLIC': 'http://odoo'}):
+            return await get_product_url.search_odoo_products_async(product_ids)
+
+    async def test_lookups_overlap(self):
+        fake = FakeOdoo()
+        found = await self.search(fake, [1, 2, 3, 4])
+
+        self.assertEqual(sorted(found), [1, 2, 3, 4])
+        self.assertEqual(found[3], {'url': 'http://odoo/shop/30', 'name': 'Product 3'})
+        self.assertEqual(fake.max_in_flight, 4)
+
+    async def test_failed_lookup_only_drops_its_product(self):
+        found = await self.search(FakeOdoo(failing_ids={2}), [1, 2, 3])
+
+        self.assertEqual(sorted(found), [1, 3])
+
+    async def test_failed_product_is_not_linked_in_the_reply(self):
+        fake = FakeOdoo(failing_ids={2})
+        with mock.patch.object(get_product_url, 'odoo_call', fake), \
+                mock.patch.dict('os.environ', {'ODOO_URL_PUBLIC': 'http://odoo'}):
+            reply = await get_product_url.bot_response_with_odoo_url_async("Try <<1>> or <<2>>.")
+
+        self.assertIn('<a href="http://odoo/shop/10" target="_blank">Product 1</a>', reply)
+        self.assertIn("[Product not found]", reply)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,16 @@
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel
 from datetime import datetime , timedelta
 import pandas as pd
 import numpy as np
 import joblib
 from prophet import Prophet
-from scipy.special import inv_boxcox
-from typing import List
+from typing import List, Literal, Optional, Union
+import json
 import os
+from forecast_cache import ForecastCache
+from model_registry import ModelRegistry, level_predictor
 from dotenv import load_dotenv
 load_dotenv()
 ip = os.getenv("IP")
@@ -23,41 +25,117 @@ model = joblib.load(os.path.join(base_path, "prophet_model.pkl"))
 scaler = joblib.load(os.path.join(base_path, "scaler.pkl"))
 boxcox_lambda = joblib.load(os.path.join(base_path, "boxcox_lambda.pkl"))
 
+# Days cached at startup: from FORECAST_CACHE_START (default the first training day)
+# to FORECAST_CACHE_DAYS_AHEAD days after the last training day
+FORECAST_CACHE_START = os.getenv("FORECAST_CACHE_START") or model.history['ds'].min()
+FORECAST_CACHE_DAYS_AHEAD = int(os.getenv("FORECAST_CACHE_DAYS_AHEAD", 730))
+
+# "numpy" evaluates yhat from the model parameters, "prophet" always calls model.predict
+FORECAST_ENGINE = os.getenv("FORECAST_ENGINE", "numpy")
+
+# Per-segment models from train_segments.py, loaded on first request, at most SEGMENT_MODELS_MAX in memory
+SEGMENT_MODELS_DIR = os.getenv("SEGMENT_MODELS_DIR") or os.path.join(base_path, "segment_models")
+SEGMENT_MODELS_MAX = int(os.getenv("SEGMENT_MODELS_MAX", 4))
+
+predict_levels = level_predictor(model, scaler, boxcox_lambda, FORECAST_ENGINE)
+print(f"[FORECAST] engine={predict_levels.engine}")
+
+forecast_cache = ForecastCache(
+    predict_levels,
+    start=FORECAST_CACHE_START,
+    end=model.history['ds'].max() + timedelta(days=FORECAST_CACHE_DAYS_AHEAD),
+).build()
+
+model_registry = ModelRegistry(
+    SEGMENT_MODELS_DIR,
+    max_models=SEGMENT_MODELS_MAX,
+    cache_start=os.getenv("FORECAST_CACHE_START"),
+    days_ahead=FORECAST_CACHE_DAYS_AHEAD,
+    engine=FORECAST_ENGINE,
+)
+
+
+def get_forecast_cache(segment=None):
+    """The global model's cache, or the segment's (``category=furniture``, ``region=west``, ...)."""
+    if segment is None:
+        return forecast_cache
+    if segment not in model_registry:
+        raise HTTPException(status_code=404, detail=f"Unknown segment: {segment}")
+    return model_registry.get(segment)
+
 # Input schema
 class ModelInput(BaseModel):
     start_date: str
     end_date: str
+    # "records": [{"ds": ..., "yhat": ...}, ...], "columns": {"ds": [...], "yhat": [...]}
+    format: Literal["records", "columns"] = "records"
+    # Segment model to forecast with, e.g. "category=furniture"; the global model when omitted
+    segment: Optional[str] = None
 
 # Output schema
 class ForecastOutput(BaseModel):
     ds: datetime
     yhat: float
 
-@app.post("/predict/", response_model=List[ForecastOutput])
+class ForecastColumns(BaseModel):
+    ds: List[datetime]
+    yhat: List[float]
+
+class DateRange(BaseModel):
+    start_date: str
+    end_date: str
+
+class BatchInput(BaseModel):
+    ranges: List[DateRange]
+    format: Literal["records", "columns"] = "records"
+    segment: Optional[str] = None
+
+
+def render_forecast(dates, yhat, format="records"):
+    """JSON body for a forecast, same text ``List[ForecastOutput]`` validation produced.
+
+    ``inv_boxcox`` gives NaN for dates long before the training data, written as
+    ``null`` like pydantic did; ``allow_nan=False`` keeps ``NaN`` out of the body.
+    """
+    ds = np.datetime_as_string(dates.to_numpy(), unit='s').tolist()
+    yhat = np.where(np.isfinite(yhat), yhat, None).tolist()
+    if format == "columns":
+        return json.dumps({"ds": ds, "yhat": yhat}, separators=(",", ":"), allow_nan=False)
+    return json.dumps([{"ds": d, "yhat": v} for d, v in zip(ds, yhat)], separators=(",", ":"), allow_nan=False)
+
+
+@app.post("/predict/", response_model=Union[List[ForecastOutput], ForecastColumns])
 def predict_sales(date: ModelInput):
-    start = datetime.strptime(date.start_date, "%Y-%m-%d") - timedelta(days=1)
+    start = datetime.strptime(date.start_date, "%Y-%m-%d")
     end = datetime.strptime(date.end_date, "%Y-%m-%d")
 
-    future_df = pd.DataFrame({'ds': pd.date_range(start=start, end=end, freq='D')})
-    future_df['month_year'] = future_df['ds'].dt.year * 100 + future_df['ds'].dt.month
+    # Levels from the cached horizon (Prophet only for days outside it), diffed into daily sales
+    dates, yhat = get_forecast_cache(date.segment).forecast(start, end)
 
-    forecast = model.predict(future_df)
+    # Serialized straight from the arrays, a Response skips per-row response_model validation
+    return Response(render_forecast(dates, yhat, date.format), media_type="application/json")
 
-    forecast['yhat_scaled_inv'] = scaler.inverse_transform(forecast[['yhat']])
-    forecast['yhat_scaled_box'] = inv_boxcox(forecast['yhat_scaled_inv'], boxcox_lambda)
+@app.post("/predict/batch", response_model=List[Union[List[ForecastOutput], ForecastColumns]])
+def predict_sales_batch(batch: BatchInput):
+    """One forecast per range, in request order, each shaped like a /predict/ response."""
+    ranges = [
+        (datetime.strptime(r.start_date, "%Y-%m-%d"), datetime.strptime(r.end_date, "%Y-%m-%d"))
+        for r in batch.ranges
+    ]
 
-    forecast['yhat_final'] = forecast['yhat_scaled_box'].diff()
-    forecast['yhat_final'] = forecast['yhat_final'].apply(lambda x: x if x >= 0 else abs(x))
+    # Overlapping windows (next week, month, quarter) share one lookup over the union of their days
+    forecasts = get_forecast_cache(batch.segment).forecast_many(ranges)
 
-    forecast = forecast.iloc[1:]
+    body = "[" + ",".join(render_forecast(dates, yhat, batch.format) for dates, yhat in forecasts) + "]"
+    return Response(body, media_type="application/json")
 
-    result = [
-        ForecastOutput(ds=row['ds'], yhat=row['yhat_final'])
-        for _, row in forecast.iterrows()
-        if start <= row['ds'] <= end
-    ]
+@app.get("/forecast/coverage")
+def get_forecast_coverage():
+    return forecast_cache.coverage()
 
-    return result
+@app.get("/segments")
+def get_segments():
+    return model_registry.info()
 
 if __name__ == '__main__':
     uvicorn.run(app, host=ip, port=1111)
\ No newline at end of file
@@ -0,0 +1,103 @@
+import pandas as pd
+import numpy as np
+import joblib
+import json
+import time
+import os
+from point_forecast import PointForecaster, check_parity
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+
+RANGES = {
+    "30 days": 30,
+    "365 days": 365,
+    "5 years": 5 * 365,
+}
+
+
+def future_frame(model, days):
+    """Request-shaped input: ``days`` dates after the last training day plus month_year."""
+    future_df = pd.DataFrame({'ds': pd.date_range(model.history['ds'].max(), periods=days, freq='D')})
+    future_df['month_year'] = future_df['ds'].dt.year * 100 + future_df['ds'].dt.month
+    return future_df
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def benchmark_point_forecast(model, repeats=5):
+    """Parity with Prophet.predict over history plus horizon, then latency per request size."""
+    history = model.history[['ds']].copy()
+    history['month_year'] = history['ds'].dt.year * 100 + history['ds'].dt.month
+    parity_df = pd.concat([history, future_frame(model, 5 * 365)], ignore_index=True)
+    print("Parity:", "OK" if check_parity(model, parity_df) else "MISMATCH")
+
+    forecaster = PointForecaster(model)
+    print(f"{'range':>10} {'prophet':>12} {'numpy':>12} {'speedup':>9}")
+    for label, days in RANGES.items():
+        future_df = future_frame(model, days)
+        prophet_seconds = best_of(lambda: model.predict(future_df), repeats)
+        numpy_seconds = best_of(lambda: forecaster.predict(future_df), repeats * 20)
+        print(f"{label:>10} {prophet_seconds * 1000:>10.1f}ms {numpy_seconds * 1000:>10.2f}ms "
+              f"{prophet_seconds / numpy_seconds:>8.0f}x")
+
+
+def per_row_response(dates, yhat):
+    """The previous /predict/ path: a ForecastOutput per row, then response_model validation."""
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from typing import List
+    from app_forcasting import ForecastOutput
+    rows = [ForecastOutput(ds=ds, yhat=value) for ds, value in zip(dates, yhat)]
+    adapter = TypeAdapter(List[ForecastOutput])
+    content = jsonable_encoder(adapter.dump_python(adapter.validate_python(rows), mode="json"))
+    return json.dumps(content, separators=(",", ":"))
+
+
+def benchmark_response_building(repeats=5):
+    from app_forcasting import forecast_cache, render_forecast
+    print(f"{'range':>10} {'per row':>12} {'records':>12} {'columns':>12}")
+    for label, days in RANGES.items():
+        start = forecast_cache.start + pd.Timedelta(days=1)
+        dates, yhat = forecast_cache.forecast(start, start + pd.Timedelta(days=days - 1))
+        assert per_row_response(dates, yhat) == render_forecast(dates, yhat)
+        timings = [
+            best_of(lambda: per_row_response(dates, yhat), repeats),
+            best_of(lambda: render_forecast(dates, yhat), repeats),
+            best_of(lambda: render_forecast(dates, yhat, "columns"), repeats),
+        ]
+        print(f"{label:>10} " + " ".join(f"{seconds * 1000:>10.2f}ms" for seconds in timings))
+
+
+def planner_ranges(start):
+    """Next week, month, quarter and year from ``start``, the windows planners compare."""
+    start = pd.Timestamp(start)
+    return [
+        {"start_date": start.strftime("%Y-%m-%d"), "end_date": (start + pd.Timedelta(days=days - 1)).strftime("%Y-%m-%d")}
+        for days in (7, 30, 91, 365)
+    ]
+
+
+def benchmark_batch(repeats=10):
+    """/predict/batch against one /predict/ call per range, inside and beyond the cached horizon."""
+    from fastapi.testclient import TestClient
+    from app_forcasting import app, forecast_cache
+    client = TestClient(app)
+    print(f"{'start':>12} {'sequential':>12} {'batch':>12}")
+    for start in (forecast_cache.end - pd.Timedelta(days=400), forecast_cache.end + pd.Timedelta(days=1)):
+        ranges = planner_ranges(start)
+        sequential_seconds = best_of(lambda: [client.post("/predict/", json=r) for r in ranges], repeats)
+        batch_seconds = best_of(lambda: client.post("/predict/batch", json={"ranges": ranges}), repeats)
+        print(f"{start.strftime('%Y-%m-%d'):>12} {sequential_seconds * 1000:>10.1f}ms {batch_seconds * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    benchmark_point_forecast(joblib.load(os.path.join(base_path, "prophet_model.pkl")))
+    benchmark_response_building()
+    benchmark_batch()
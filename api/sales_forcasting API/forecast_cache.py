@@ -0,0 +1,85 @@
+import pandas as pd
+import numpy as np
+import threading
+import time
+
+
+class ForecastCache:
+    """Daily forecast levels over a fixed horizon, computed once.
+
+    A level is the model output mapped back to cumulative sales (scaler inverse,
+    then inverse Box-Cox). Daily sales are the absolute day-to-day differences of
+    the levels, so a request for [start, end] needs the levels from start - 1 to
+    end: those inside the horizon are sliced from the array, only days outside it
+    go through ``predict_levels``.
+    """
+
+    def __init__(self, predict_levels, start, end):
+        self.predict_levels = predict_levels
+        self.start = pd.Timestamp(start).normalize()
+        self.end = pd.Timestamp(end).normalize()
+        self.levels = None
+        self.build_seconds = None
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "cached_days": 0, "computed_days": 0}
+
+    def build(self):
+        start_time = time.time()
+        dates = pd.date_range(self.start, self.end, freq='D')
+        self.levels = np.asarray(self.predict_levels(dates), dtype=np.float64)
+        self.build_seconds = time.time() - start_time
+        print(f"[FORECAST CACHE] {len(dates)} days ({self.start.date()} to {self.end.date()}) "
+              f"computed in {self.build_seconds:.2f} seconds")
+        return self
+
+    def get_levels(self, start, end):
+        """``(dates, levels)`` for every day from ``start`` to ``end`` inclusive."""
+        dates = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq='D')
+        return dates, self.levels_at(dates)
+
+    def levels_at(self, dates):
+        """Levels for arbitrary days, one ``predict_levels`` call for all those outside the horizon."""
+        levels = np.empty(len(dates), dtype=np.float64)
+        offsets = (dates - self.start).days.to_numpy()
+        inside = (offsets >= 0) & (offsets < len(self.levels))
+        levels[inside] = self.levels[offsets[inside]]
+        if not inside.all():
+            levels[~inside] = self.predict_levels(dates[~inside])
+
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["cached_days"] += int(inside.sum())
+            self.stats["computed_days"] += int((~inside).sum())
+        return levels
+
+    def forecast(self, start_date, end_date):
+        """``(dates, yhat)`` of daily sales for ``start_date`` to ``end_date`` inclusive."""
+        dates, levels = self.get_levels(pd.Timestamp(start_date) - pd.Timedelta(days=1), end_date)
+        return dates[1:], np.abs(np.diff(levels))
+
+    def forecast_many(self, ranges):
+        """``forecast`` for each ``(start_date, end_date)``, levels looked up once for the union of days."""
+        spans = [
+            pd.date_range(pd.Timestamp(start).normalize() - pd.Timedelta(days=1), pd.Timestamp(end).normalize(), freq='D')
+            for start, end in ranges
+        ]
+        union = np.unique(np.concatenate([span.to_numpy() for span in spans] or [np.array([], 'datetime64[ns]')]))
+        levels = self.levels_at(pd.DatetimeIndex(union))
+        results = []
+        for span in spans:
+            span_levels = levels[np.searchsorted(union, span.to_numpy())]
+            results.append((span[1:], np.abs(np.diff(span_levels))))
+        return results
+
+    def coverage(self):
+        with self._lock:
+            stats = dict(self.stats)
+        total = stats["cached_days"] + stats["computed_days"]
+        return {
+            "start": self.start.strftime("%Y-%m-%d"),
+            "end": self.end.strftime("%Y-%m-%d"),
+            "days": 0 if self.levels is None else len(self.levels),
+            "build_seconds": self.build_seconds,
+            **stats,
+            "cached_fraction": stats["cached_days"] / total if total else None,
+        }
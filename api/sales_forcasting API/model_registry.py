@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from datetime import timedelta
+from scipy.special import inv_boxcox
+import pandas as pd
+import threading
+import joblib
+import json
+import time
+import os
+from forecast_cache import ForecastCache
+from point_forecast import PointForecaster
+
+SEGMENT_MODELS_DIR = os.getenv("SEGMENT_MODELS_DIR", "segment_models")
+SEGMENTS_INDEX = "segments.json"
+# Same file names as the global model, one directory per segment
+MODEL_FILES = ("prophet_model.pkl", "scaler.pkl", "boxcox_lambda.pkl")
+
+
+def normalize_key(key):
+    """``Category=Office Supplies`` -> ``category=office_supplies``, the form res.partner's x_segement uses."""
+    return key.strip().lower().replace(" ", "_")
+
+
+def segment_key(dimension, value):
+    return normalize_key(f"{dimension}={value}")
+
+
+def level_predictor(model, scaler, boxcox_lambda, engine="numpy"):
+    """``predict_levels(dates)``: model output mapped back through the scaler and Box-Cox."""
+    point_forecaster = PointForecaster(model) if engine == "numpy" and PointForecaster.supports(model) else None
+
+    def predict_levels(dates):
+        future_df = pd.DataFrame({'ds': dates})
+        future_df['month_year'] = future_df['ds'].dt.year * 100 + future_df['ds'].dt.month
+
+        if point_forecaster is not None:
+            yhat = point_forecaster.predict(future_df)
+        else:
+            yhat = model.predict(future_df)['yhat'].to_numpy()
+
+        yhat_scaled_inv = scaler.inverse_transform(yhat.reshape(-1, 1))[:, 0]
+        return inv_boxcox(yhat_scaled_inv, boxcox_lambda)
+
+    predict_levels.engine = 'numpy' if point_forecaster else 'prophet'
+    return predict_levels
+
+
+def load_forecast_cache(directory, cache_start=None, days_ahead=730, engine="numpy"):
+    """Model, scaler and Box-Cox lambda from ``directory``, served through a built ``ForecastCache``."""
+    model, scaler, boxcox_lambda = (joblib.load(os.path.join(directory, name)) for name in MODEL_FILES)
+    predict_levels = level_predictor(model, scaler, boxcox_lambda, engine)
+    print(f"[FORECAST] {directory}: engine={predict_levels.engine}")
+    return ForecastCache(
+        predict_levels,
+        start=cache_start or model.history['ds'].min(),
+        end=model.history['ds'].max() + timedelta(days=days_ahead),
+    ).build()
+
+
+def save_segment(directory, model, scaler, boxcox_lambda):
+    os.makedirs(directory, exist_ok=True)
+    # Written next to the target and renamed, a serving process may be loading the old files
+    for name, obj in zip(MODEL_FILES, (model, scaler, boxcox_lambda)):
+        tmp_path = os.path.join(directory, f"{name}.tmp")
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, os.path.join(directory, name))
+
+
+def save_index(segments, directory=SEGMENT_MODELS_DIR):
+    """``segments`` maps a segment key (``category=furniture``) to its directory name."""
+    tmp_path = os.path.join(directory, f"{SEGMENTS_INDEX}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(segments, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(directory, SEGMENTS_INDEX))
+
+
+class ModelRegistry:
+    """Per-segment forecast models, loaded on first use with at most ``max_models`` resident.
+
+    Segments come from the ``segments.json`` index written by train_segments.py.
+    A loaded segment is its ``ForecastCache``, so it serves exactly like the
+    global model; the least recently used one is dropped past the bound.
+    """
+
+    def __init__(self, directory=SEGMENT_MODELS_DIR, max_models=4, **cache_kwargs):
+        self.directory = directory
+        self.max_models = max_models
+        self.cache_kwargs = cache_kwargs
+        self.segments = {}
+        index_path = os.path.join(directory, SEGMENTS_INDEX)
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                self.segments = json.load(f)
+        self._resident = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+        print(f"[SEGMENTS] {len(self.segments)} segment models in {directory}, at most {max_models} resident")
+
+    def __contains__(self, key):
+        return normalize_key(key) in self.segments
+
+    def get(self, key):
+        """The segment's ``ForecastCache``, loading it if needed; ``KeyError`` for unknown segments."""
+        key = normalize_key(key)
+        path = os.path.join(self.directory, self.segments[key])
+        with self._lock:
+            cache = self._resident.get(key)
+            if cache is not None:
+                self._resident.move_to_end(key)
+                return cache
+
+        # Loaded outside the lock so other segments keep serving; a concurrent
+        # first request for the same segment may load it twice, the last one stays
+        start_time = time.time()
+        cache = load_forecast_cache(path, **self.cache_kwargs)
+        print(f"[SEGMENTS] Loaded {key} in {time.time() - start_time:.2f} seconds")
+
+        with self._lock:
+            self._resident[key] = cache
+            self._resident.move_to_end(key)
+            self.loads += 1
+            while len(self._resident) > self.max_models:
+                evicted, _ = self._resident.popitem(last=False)
+                self.evictions += 1
+                print(f"[SEGMENTS] Evicted {evicted}")
+        return cache
+
+    def info(self):
+        with self._lock:
+            resident = list(self._resident)
+        return {
+            "segments": sorted(self.segments),
+            "resident": resident,
+            "max_models": self.max_models,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
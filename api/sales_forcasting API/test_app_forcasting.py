@@ -0,0 +1,71 @@
+import json
+import unittest
+from typing import List
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app_forcasting import app, render_forecast, ForecastOutput
+
+
+def strict_loads(text):
+    """``json.loads`` that fails on ``NaN``/``Infinity``, which are not JSON."""
+    def reject(constant):
+        raise ValueError(f"invalid JSON constant {constant}")
+    return json.loads(text, parse_constant=reject)
+
+
+class RenderForecastTest(unittest.TestCase):
+
+    def test_non_finite_yhat_is_null(self):
+        dates = pd.date_range("2015-01-01", periods=3, freq="D")
+        yhat = np.array([1.5, np.nan, np.inf])
+
+        records = strict_loads(render_forecast(dates, yhat))
+        columns = strict_loads(render_forecast(dates, yhat, "columns"))
+
+        self.assertEqual([row["yhat"] for row in records], [1.5, None, None])
+        self.assertEqual(columns["yhat"], [1.5, None, None])
+
+    def test_matches_the_response_model_serialization(self):
+        dates = pd.date_range("1990-01-01", periods=2, freq="D").append(pd.date_range("2015-01-01", periods=2))
+        yhat = np.array([np.nan, np.nan, 9063.631256725603, 847.4673984088931])
+
+        # The previous /predict/: rows returned through response_model=List[ForecastOutput]
+        baseline = FastAPI()
+
+        @baseline.get("/", response_model=List[ForecastOutput])
+        def rows():
+            return [ForecastOutput(ds=ds, yhat=value) for ds, value in zip(dates, yhat)]
+
+        self.assertEqual(render_forecast(dates, yhat), TestClient(baseline).get("/").text)
+
+
+class PredictTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_dates_before_the_box_cox_range_are_valid_json(self):
+        response = self.client.post("/predict/", json={"start_date": "1990-01-01", "end_date": "1990-01-07"})
+
+        self.assertEqual(response.status_code, 200)
+        rows = strict_loads(response.text)
+        self.assertEqual(len(rows), 7)
+        self.assertTrue(all(row["yhat"] is None for row in rows))
+
+    def test_batch_mixes_null_and_finite_forecasts(self):
+        response = self.client.post("/predict/batch", json={"ranges": [
+            {"start_date": "1990-01-01", "end_date": "1990-01-02"},
+            {"start_date": "2015-01-01", "end_date": "2015-01-02"},
+        ], "format": "columns"})
+
+        early, recent = strict_loads(response.text)
+        self.assertEqual(early["yhat"], [None, None])
+        self.assertTrue(all(isinstance(value, float) for value in recent["yhat"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
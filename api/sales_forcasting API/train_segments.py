@@ -0,0 +1,93 @@
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.preprocessing import StandardScaler
+from scipy.stats import boxcox
+from prophet import Prophet
+import pandas as pd
+import argparse
+import time
+import os
+from model_registry import SEGMENT_MODELS_DIR, segment_key, save_segment, save_index
+
+SUPERSTORE_CSV = os.getenv("SUPERSTORE_CSV", 'Superstore-Data-1-review (1).csv')
+# Segment dimension -> superstore column; values match res.partner's x_segement / x_region
+DIMENSIONS = {
+    'category': 'Category',
+    'region': 'Region',
+    'segment': 'Segment',
+}
+# Segments with fewer order days than this are skipped, too little history for the seasonalities
+MIN_DAYS = 180
+
+
+def load_orders(path=SUPERSTORE_CSV, date_format=None):
+    orders = pd.read_csv(path, encoding='ISO-8859-1', usecols=['Order Date', 'Sales', *DIMENSIONS.values()])
+    orders['Order Date'] = pd.to_datetime(orders['Order Date'], format=date_format)
+    return orders
+
+
+def daily_sales(orders, train_end=None):
+    """Sales summed per order day, the series the global model was trained on."""
+    daily = orders.groupby('Order Date', as_index=False)['Sales'].sum()
+    daily = daily.rename(columns={'Order Date': 'ds'}).sort_values('ds')
+    if train_end is not None:
+        daily = daily[daily['ds'] <= pd.Timestamp(train_end)]
+    return daily
+
+
+def train_segment(key, daily, directory):
+    """Same pipeline as prophet_model.pkl: cumulative sales -> Box-Cox -> StandardScaler -> Prophet."""
+    start_time = time.time()
+
+    df = pd.DataFrame({'ds': daily['ds'], 'Cumulative_Sales': daily['Sales'].cumsum()})
+    df['Cumulative_Sales'], boxcox_lambda = boxcox(df['Cumulative_Sales'])
+    scaler = StandardScaler()
+    df['y'] = scaler.fit_transform(df[['Cumulative_Sales']])[:, 0]
+    df['month_year'] = df['ds'].dt.year * 100 + df['ds'].dt.month
+
+    model = Prophet(seasonality_prior_scale=0.1, changepoint_prior_scale=0.01)
+    model.add_seasonality(name='monthly', period=30.5, fourier_order=10)
+    model.add_regressor('month_year')
+    model.fit(df[['ds', 'y', 'month_year']])
+
+    save_segment(os.path.join(directory, key.replace("=", "-")), model, scaler, boxcox_lambda)
+    return key, len(df), time.time() - start_time
+
+
+def train_segments(orders, directory=SEGMENT_MODELS_DIR, workers=None, train_end=None):
+    """Fit every segment's model in a process pool and write the segments.json index."""
+    jobs = {}
+    for dimension, column in DIMENSIONS.items():
+        for value, group in orders.groupby(column):
+            daily = daily_sales(group, train_end)
+            key = segment_key(dimension, value)
+            if len(daily) < MIN_DAYS:
+                print(f"Skipping {key}: {len(daily)} order days")
+                continue
+            jobs[key] = daily
+
+    os.makedirs(directory, exist_ok=True)
+    segments = {}
+    # Each fit is single-threaded Stan, one process per core trains the segments side by side
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(train_segment, key, daily, directory) for key, daily in jobs.items()]
+        for future in futures:
+            key, rows, seconds = future.result()
+            segments[key] = key.replace("=", "-")
+            print(f"Trained {key} on {rows} days in {seconds:.1f} seconds")
+
+    save_index(segments, directory)
+    return segments
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train one forecasting model per category, region and segment.")
+    parser.add_argument("--csv", default=SUPERSTORE_CSV)
+    parser.add_argument("--directory", default=SEGMENT_MODELS_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="Processes to train with (default: CPU count).")
+    parser.add_argument("--date-format", default=None, help="Order Date format, inferred when omitted.")
+    parser.add_argument("--train-end", default=None, help="Last order day used for training (YYYY-MM-DD).")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    segments = train_segments(load_orders(args.csv, args.date_format), args.directory, args.workers, args.train_end)
+    print(f"{len(segments)} segment models written to {args.directory} in {time.time() - start_time:.1f} seconds.")
@@ -0,0 +1 @@
+"""Encoder, embedding cache and NumPy vector index shared by Search_recom API and chatBot_model."""
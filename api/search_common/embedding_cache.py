@@ -0,0 +1,193 @@
+from collections import OrderedDict
+import numpy as np
+import threading
+import sqlite3
+import time
+
+
+class LRUTTLCache:
+    """Bounded in-memory cache with least-recently-used and time-to-live eviction."""
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, expires_at=None):
+        if expires_at is None and self.ttl_seconds:
+            expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class EmbeddingCache:
+    """Caches query embeddings by normalized text and model name.
+
+    Misses are encoded together in one ``model.encode`` call. When ``disk_path``
+    is set, embeddings are also written to a SQLite file so the cache survives
+    restarts; entries there follow the same TTL, expired rows are deleted and
+    the oldest rows beyond ``disk_max_entries`` are evicted.
+    """
+
+    def __init__(self, model, model_name, max_entries=10000, ttl_seconds=3600, disk_path=None,
+                 disk_max_entries=100000):
+        self.model = model
+        self.model_name = model_name
+        self.memory = LRUTTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self.disk_expirations = 0
+        self.encoded = 0
+
+        self._disk = None
+        self._disk_lock = threading.Lock()
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, expires_at REAL, dtype TEXT, vector BLOB)"
+            )
+            self._disk.execute("CREATE INDEX IF NOT EXISTS embeddings_expires_at ON embeddings (expires_at)")
+            with self._disk_lock:
+                self._disk_purge()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(str(text).lower().split())
+
+    def _key(self, text):
+        return f"{self.model_name}\x1f{self.normalize(text)}"
+
+    def _disk_get(self, key):
+        with self._disk_lock:
+            row = self._disk.execute(
+                "SELECT expires_at, dtype, vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, None
+            expires_at, dtype, blob = row
+            if expires_at is not None and expires_at < time.time():
+                self._disk.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self._disk.commit()
+                self.disk_expirations += 1
+                return None, None
+        return np.frombuffer(blob, dtype=dtype), expires_at
+
+    def _disk_purge(self):
+        """Delete expired rows, then the oldest written rows past ``disk_max_entries``; call with the lock held."""
+        expired = self._disk.execute("DELETE FROM embeddings WHERE expires_at < ?", (time.time(),)).rowcount
+        self.disk_expirations += max(expired, 0)
+        # INSERT OR REPLACE gives a rewritten key a new rowid, so rowid order is write order
+        (count,) = self._disk.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.disk_max_entries:
+            self._disk.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                (count - self.disk_max_entries,)
+            )
+            self.disk_evictions += count - self.disk_max_entries
+        self._disk.commit()
+
+    def _disk_set_many(self, items):
+        ttl = self.memory.ttl_seconds
+        expires_at = time.time() + ttl if ttl else None
+        rows = [(key, expires_at, vector.dtype.str, vector.tobytes()) for key, vector in items]
+        with self._disk_lock:
+            self._disk.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, expires_at, dtype, vector) VALUES (?, ?, ?, ?)", rows
+            )
+            self._disk_purge()
+
+    def encode(self, texts, **encode_kwargs):
+        """Drop-in for ``model.encode``: a string gives one vector, a list gives a 2-D array."""
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        keys = [self._key(text) for text in texts]
+        vectors = {}
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in missing:
+                continue
+            vector = self.memory.get(key)
+            if vector is None and self._disk is not None:
+                vector, expires_at = self._disk_get(key)
+                if vector is not None:
+                    self.disk_hits += 1
+                    self.memory.set(key, vector, expires_at=expires_at)
+            if vector is None:
+                missing[key] = text
+            else:
+                vectors[key] = vector
+
+        if missing:
+            missing_keys = list(missing)
+            encoded = np.asarray(self.model.encode(list(missing.values()), **encode_kwargs), dtype=np.float32)
+            self.encoded += len(missing_keys)
+            for key, vector in zip(missing_keys, encoded):
+                self.memory.set(key, vector)
+                vectors[key] = vector
+            if self._disk is not None:
+                self._disk_set_many(zip(missing_keys, encoded))
+
+        result = np.stack([vectors[key] for key in keys]) if keys else np.empty((0, 0), dtype=np.float32)
+        return result[0] if single else result
+
+    def get_stats(self):
+        return dict(
+            self.memory.get_stats(),
+            model_name=self.model_name,
+            disk_path=self.disk_path,
+            disk_hits=self.disk_hits,
+            disk_max_entries=self.disk_max_entries if self.disk_path else None,
+            disk_evictions=self.disk_evictions,
+            disk_expirations=self.disk_expirations,
+            encoded=self.encoded,
+        )
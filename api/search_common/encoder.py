@@ -0,0 +1,106 @@
+from sentence_transformers import SentenceTransformer
+import numpy as np
+import time
+import os
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "./onnx_model")
+ONNX_QUANTIZATION = os.getenv("ONNX_QUANTIZATION", "avx2")  # arm64, avx2, avx512 or avx512_vnni
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def onnx_session_options():
+    import onnxruntime as ort
+
+    # One request encodes a handful of short queries, so parallelism goes inside
+    # the operators and the graph runs sequentially.
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = int(os.getenv("ONNX_INTRA_OP_THREADS", os.cpu_count() or 1))
+    options.inter_op_num_threads = int(os.getenv("ONNX_INTER_OP_THREADS", 1))
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+
+def quantized_file_name(quantization=ONNX_QUANTIZATION):
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+
+def export_onnx_model(model_name=MODEL_NAME, output_dir=ONNX_MODEL_DIR, quantization=ONNX_QUANTIZATION):
+    """Export the model to ONNX and write a dynamically int8-quantized copy next to it."""
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    start_time = time.time()
+    model = SentenceTransformer(model_name, backend="onnx", model_kwargs={"provider": "CPUExecutionProvider"})
+    model.save_pretrained(output_dir)
+    export_dynamic_quantized_onnx_model(model, quantization, output_dir)
+    print(f"[ENCODER] Exported {model_name} to {output_dir} ({quantization} int8) "
+          f"in {time.time() - start_time:.2f} seconds")
+
+
+def encoder_name(backend=None, model_name=MODEL_NAME):
+    backend = backend or os.getenv("ENCODER_BACKEND", "torch")
+    return model_name if backend == "torch" else f"{model_name}/{backend}"
+
+
+def load_encoder(backend=None, model_name=MODEL_NAME):
+    """Return ``(model, cache_name)`` for the backend picked by ENCODER_BACKEND.
+
+    ``cache_name`` identifies model and backend, quantized embeddings differ
+    slightly from the PyTorch ones and must not share embedding cache entries.
+    """
+    backend = backend or os.getenv("ENCODER_BACKEND", "torch")
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}', expected one of {ENCODER_BACKENDS}")
+
+    if backend == "torch":
+        return SentenceTransformer(model_name), encoder_name(backend, model_name)
+
+    file_name = quantized_file_name() if backend == "onnx-int8" else "onnx/model.onnx"
+    if not os.path.exists(os.path.join(ONNX_MODEL_DIR, file_name)):
+        export_onnx_model(model_name, ONNX_MODEL_DIR)
+
+    model = SentenceTransformer(
+        ONNX_MODEL_DIR,
+        backend="onnx",
+        model_kwargs={
+            "file_name": file_name,
+            "provider": "CPUExecutionProvider",
+            "session_options": onnx_session_options(),
+        },
+    )
+    return model, encoder_name(backend, model_name)
+
+
+def check_parity(sentences, backend="onnx-int8", rounds=5):
+    """Compare a backend against PyTorch: per-sentence cosine and pairwise similarity drift."""
+    reference, _ = load_encoder("torch")
+    candidate, _ = load_encoder(backend)
+
+    ref = reference.encode(sentences, normalize_embeddings=True)
+    emb = candidate.encode(sentences, normalize_embeddings=True)
+    cosine = np.einsum("ij,ij->i", ref, emb)
+    similarity_drift = np.abs(ref @ ref.T - emb @ emb.T)
+
+    timings = {}
+    for name, model in (("torch", reference), (backend, candidate)):
+        start_time = time.time()
+        for _ in range(rounds):
+            for sentence in sentences:
+                model.encode(sentence)
+        timings[name] = (time.time() - start_time) / (rounds * len(sentences))
+
+    print(f"[PARITY] {backend} vs torch on {len(sentences)} sentences")
+    print(f"  cosine(torch, {backend}): min={cosine.min():.4f} mean={cosine.mean():.4f}")
+    print(f"  pairwise similarity drift: max={similarity_drift.max():.4f} mean={similarity_drift.mean():.4f}")
+    for name, latency in timings.items():
+        print(f"  {name:10s} {latency * 1000:.2f} ms/query")
+    return cosine, similarity_drift
+
+
+if __name__ == "__main__":
+    export_onnx_model()
+    check_parity([
+        "chair", "printer", "phone", "office desk", "wireless mouse", "Nokia Lumia 521",
+        "Avery binder labels", "Logitech headset", "cheap bookcase for a small room",
+    ])
@@ -0,0 +1,310 @@
+from contextlib import contextmanager
+import numpy as np
+import threading
+import shutil
+import json
+import time
+import re
+import os
+
+INDEX_MODES = ("float32", "float16", "int8")
+QUERY_CHUNK_ROWS = 16384
+
+
+class NumpyVectorIndex:
+    """Exact top-k search over an in-memory (or memory-mapped) embedding matrix.
+
+    ``query`` and ``get`` follow the ChromaDB collection API (same arguments and
+    result shape, squared L2 distances) so it can replace a collection in
+    ``search_inventory``. Vectors can be stored as float32, float16 or int8 with a
+    per-row scale; norms are always kept in float32. ``encoder`` names the model
+    and backend the vectors came from (``encoder.encoder_name``).
+    """
+
+    def __init__(self, ids, documents, metadatas, vectors, norms, scales=None, mode="float32", encoder=None):
+        if mode not in INDEX_MODES:
+            raise ValueError(f"Unknown index mode '{mode}', expected one of {INDEX_MODES}")
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+        self.vectors = vectors
+        self.norms = norms
+        self.scales = scales
+        self.mode = mode
+        self.encoder = encoder
+        self._positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self._columns = {}
+
+    @classmethod
+    def build(cls, ids, embeddings, documents, metadatas, mode="float32", encoder=None):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.einsum("ij,ij->i", embeddings, embeddings).astype(np.float32)
+        scales = None
+        if mode == "float16":
+            vectors = embeddings.astype(np.float16)
+        elif mode == "int8":
+            # Symmetric per-row quantization, dot products are rescaled at query time
+            scales = np.abs(embeddings).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            vectors = np.round(embeddings / scales[:, None]).astype(np.int8)
+            scales = scales.astype(np.float32)
+        else:
+            vectors = embeddings
+        return cls(ids, documents, metadatas, vectors, norms, scales=scales, mode=mode, encoder=encoder)
+
+    @classmethod
+    def from_collection(cls, collection, mode="float32", encoder=None):
+        data = collection.get(include=["embeddings", "documents", "metadatas"])
+        return cls.build(data['ids'], data['embeddings'], data['documents'], data['metadatas'],
+                         mode=mode, encoder=encoder)
+
+    def save(self, path, keep=2):
+        """Write the arrays into a new version directory, then replace ``meta.json``.
+
+        ``meta.json`` names the version its arrays live in, so a reader gets the
+        old index or the new one, never new vectors with old IDs. Files a running
+        service may have memory-mapped are never replaced in place (that fails on
+        Windows); versions more than ``keep`` saves old are removed.
+        """
+        os.makedirs(path, exist_ok=True)
+        version = f"v{time.time_ns()}"
+        os.makedirs(os.path.join(path, version))
+        arrays = {"vectors": self.vectors, "norms": self.norms}
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        for name, array in arrays.items():
+            np.save(os.path.join(path, version, f"{name}.npy"), array)
+
+        tmp_path = os.path.join(path, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": version,
+                "mode": self.mode,
+                "dim": int(self.vectors.shape[1]) if self.vectors.ndim == 2 else 0,
+                "encoder": self.encoder,
+                "ids": self.ids,
+                "documents": self.documents,
+                "metadatas": self.metadatas,
+            }, f)
+        os.replace(tmp_path, os.path.join(path, "meta.json"))
+
+        versions = sorted(
+            (int(entry[1:]), entry) for entry in os.listdir(path)
+            if re.fullmatch(r"v\d+", entry) and os.path.isdir(os.path.join(path, entry))
+        )
+        for _, entry in versions[:-keep]:
+            shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+
+    @classmethod
+    def load(cls, path, mmap=True, encoder=None):
+        """Open a saved index; with ``encoder`` set, refuse one embedded by another encoder."""
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        # Vectors from another backend live in a different space, query distances would be meaningless
+        if encoder is not None and meta.get("encoder") not in (None, encoder):
+            raise ValueError(f"Vector index in {path} was embedded with {meta['encoder']}, "
+                             f"queries use {encoder}; rebuild it with load_data.py")
+        # Indexes saved before versioned directories keep their arrays next to meta.json
+        arrays_path = os.path.join(path, meta.get("version", ""))
+        mmap_mode = "r" if mmap else None
+        vectors = np.load(os.path.join(arrays_path, "vectors.npy"), mmap_mode=mmap_mode)
+        norms = np.load(os.path.join(arrays_path, "norms.npy"))
+        scales_path = os.path.join(arrays_path, "scales.npy")
+        scales = np.load(scales_path) if os.path.exists(scales_path) else None
+
+        rows = len(meta["ids"])
+        problems = []
+        if vectors.shape[0] != rows or len(norms) != rows or (scales is not None and len(scales) != rows):
+            problems.append(f"{rows} ids but {vectors.shape[0]} vectors, {len(norms)} norms")
+        if len(meta["documents"]) != rows or len(meta["metadatas"]) != rows:
+            problems.append(f"{rows} ids but {len(meta['documents'])} documents, {len(meta['metadatas'])} metadatas")
+        if "dim" in meta and rows and vectors.shape[1] != meta["dim"]:
+            problems.append(f"dim {vectors.shape[1]}, meta says {meta['dim']}")
+        if (scales is not None) != (meta["mode"] == "int8"):
+            problems.append(f"scales do not match mode {meta['mode']}")
+        if problems:
+            raise ValueError(f"Inconsistent vector index in {path}: " + "; ".join(problems))
+        return cls(meta["ids"], meta["documents"], meta["metadatas"], vectors, norms,
+                   scales=scales, mode=meta["mode"], encoder=meta.get("encoder"))
+
+    def count(self):
+        return len(self.ids)
+
+    def _column(self, field):
+        column = self._columns.get(field)
+        if column is None:
+            column = np.array([(m or {}).get(field) for m in self.metadatas], dtype=object)
+            self._columns[field] = column
+        return column
+
+    def _where_mask(self, where):
+        """Boolean mask for a Chroma-style ``where`` filter ($eq, $ne, $in, $nin, $and, $or)."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for field, condition in where.items():
+            if field == "$and":
+                for sub in condition:
+                    mask &= self._where_mask(sub)
+                continue
+            if field == "$or":
+                any_mask = np.zeros(len(self.ids), dtype=bool)
+                for sub in condition:
+                    any_mask |= self._where_mask(sub)
+                mask &= any_mask
+                continue
+
+            column = self._column(field)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                if op == "$eq":
+                    mask &= column == value
+                elif op == "$ne":
+                    mask &= column != value
+                elif op == "$in":
+                    mask &= np.isin(column, list(value))
+                elif op == "$nin":
+                    mask &= ~np.isin(column, list(value))
+                else:
+                    raise ValueError(f"Unsupported where operator '{op}'")
+        return mask
+
+    def _dot(self, queries):
+        dots = np.empty((queries.shape[0], len(self.ids)), dtype=np.float32)
+        for start in range(0, len(self.ids), QUERY_CHUNK_ROWS):
+            block = np.asarray(self.vectors[start:start + QUERY_CHUNK_ROWS], dtype=np.float32)
+            dots[:, start:start + block.shape[0]] = queries @ block.T
+        if self.scales is not None:
+            dots *= self.scales
+        return dots
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None):
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if not self.ids:
+            for key in result:
+                result[key] = [[] for _ in range(len(queries))]
+            return result
+
+        # Squared L2, the same distance Chroma's default "l2" space reports
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+        distances = query_norms[:, None] + self.norms[None, :] - 2.0 * self._dot(queries)
+
+        candidates = np.arange(len(self.ids))
+        if where:
+            candidates = np.flatnonzero(self._where_mask(where))
+            distances = distances[:, candidates]
+        k = min(n_results, len(candidates))
+
+        for row in distances:
+            if k == 0:
+                top = np.empty(0, dtype=np.int64)
+            elif k < len(row):
+                top = np.argpartition(row, k - 1)[:k]
+                top = top[np.argsort(row[top], kind="stable")]
+            else:
+                top = np.argsort(row, kind="stable")
+            positions = candidates[top]
+            result["ids"].append([self.ids[p] for p in positions])
+            result["documents"].append([self.documents[p] for p in positions])
+            result["metadatas"].append([self.metadatas[p] for p in positions])
+            result["distances"].append(row[top].tolist())
+        return result
+
+    def get(self, ids=None, where=None, include=None):
+        if ids is None:
+            positions = range(len(self.ids))
+        else:
+            positions = [self._positions[doc_id] for doc_id in ids if doc_id in self._positions]
+        if where:
+            mask = self._where_mask(where)
+            positions = [p for p in positions if mask[p]]
+        return {
+            "ids": [self.ids[p] for p in positions],
+            "documents": [self.documents[p] for p in positions],
+            "metadatas": [self.metadatas[p] for p in positions],
+        }
+
+
+class NumpyIndexManager:
+    """Same interface as ``CollectionManager`` for a saved ``NumpyVectorIndex``."""
+
+    def __init__(self, index_path="./numpy_index", check_interval=2.0, encoder=None):
+        self.index_path = index_path
+        self.check_interval = check_interval
+        self.encoder = encoder
+
+        self._lock = threading.RLock()
+        self._index = None
+        self._signature = None
+        self._failed_signature = None
+        self._last_check = 0.0
+
+        self.stats = {
+            "open_count": 0,
+            "reload_count": 0,
+            "last_open_seconds": None,
+            "last_opened_at": None,
+        }
+
+    def _index_signature(self):
+        try:
+            st = os.stat(os.path.join(self.index_path, "meta.json"))
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _open(self, reload=False):
+        start_time = time.time()
+        self._index = NumpyVectorIndex.load(self.index_path, encoder=self.encoder)
+        self._signature = self._index_signature()
+        self._last_check = time.time()
+        elapsed = time.time() - start_time
+
+        self.stats["open_count"] += 1
+        if reload:
+            self.stats["reload_count"] += 1
+        self.stats["last_open_seconds"] = round(elapsed, 4)
+        self.stats["last_opened_at"] = time.time()
+        print(f"[NUMPY INDEX] {'Reloaded' if reload else 'Opened'} {self.index_path} "
+              f"({self._index.count()} vectors, {self._index.mode}) in {elapsed:.3f} seconds")
+
+    def open(self):
+        with self._lock:
+            if self._index is None:
+                self._open()
+        return self._index
+
+    def reload(self):
+        with self._lock:
+            self._open(reload=True)
+        return self._index
+
+    def get_collection(self):
+        now = time.time()
+        if self._index is not None and now - self._last_check < self.check_interval:
+            return self._index
+
+        with self._lock:
+            if self._index is None:
+                self._open()
+            else:
+                self._last_check = now
+                signature = self._index_signature()
+                if signature != self._signature and signature != self._failed_signature:
+                    try:
+                        self._open(reload=True)
+                    except Exception as e:
+                        # Keep serving the current index, retry once the files change again
+                        self._failed_signature = signature
+                        print(f"[NUMPY INDEX] Reload of {self.index_path} failed, keeping the current index: {e}")
+            return self._index
+
+    @contextmanager
+    def collection(self):
+        """Same as ``CollectionManager.collection``, a replaced index stays usable while it is referenced."""
+        yield self.get_collection()
+
+    def get_stats(self):
+        with self._lock:
+            mode = self._index.mode if self._index is not None else None
+            return dict(self.stats, index_path=self.index_path, mode=mode)
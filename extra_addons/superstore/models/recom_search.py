@@ -17,9 +17,9 @@ class MySearchRecomModel(models.Model):
             result = self.get_recommendation_from_api(record.search_text)
             record.search_recom_result = str(result) if not isinstance(result, str) else result # Store raw result (or error)
 
-    def get_recommendation_from_api(self, query):
+    def get_recommendation_from_api(self, query, offset=0, limit=20):
         """Function to be used by controller and button"""
-        payload = {"query": str(query)}
+        payload = {"query": str(query), "offset": offset, "limit": limit}
 
         try:
             response = requests.post(f"http://{ip}:1114/predict", json=payload)
@@ -101,7 +101,9 @@ class MyForecastModel(models.Model):
 
         payload = {
             "start_date": str(self.start_date),
-            "end_date": str(self.end_date)
+            "end_date": str(self.end_date),
+            # Columnar response: {"ds": [...], "yhat": [...]} instead of one object per day
+            "format": "columns"
         }
 
         api_url = f"http://{ip}:1111/predict/"
@@ -118,6 +120,13 @@ class MyForecastModel(models.Model):
                 result_data = response.json()
                 _logger.debug(f"API Response Data: {result_data}")
 
+                # Columnar response back to the per-day entries below (a list is still accepted as is)
+                if isinstance(result_data, dict) and 'ds' in result_data and 'yhat' in result_data:
+                    result_data = [
+                        {'ds': ds, 'yhat': yhat}
+                        for ds, yhat in zip(result_data['ds'], result_data['yhat'])
+                    ]
+
                 table_html = """
 <div class="table-responsive">
 <p>Forecast results from %s to %s:</p>